@@ -0,0 +1,48 @@
+"""Add hot-path indexes for reservations and reservation_queue
+
+Revision ID: 1330844311db
+Revises: 9fb9c1c5a087
+Create Date: 2026-10-18 10:02:41.730215
+
+Indexes are built with CREATE INDEX CONCURRENTLY on Postgres so the migration
+can run against a live database without blocking writes. CONCURRENTLY cannot
+run inside a transaction, hence the autocommit block. If a concurrent build is
+interrupted it leaves an INVALID index behind: drop it and rerun the upgrade.
+
+customers.user_id is not listed: its UNIQUE constraint already creates an index.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1330844311db'
+down_revision: Union[str, None] = '9fb9c1c5a087'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # reserve_book: count of a customer's reservations
+    ('ix_reservations_customer_id', 'reservations', ['customer_id']),
+    # admin views and removals: reservations of a book, optionally for one customer
+    ('ix_reservations_book_id_customer_id', 'reservations', ['book_id', 'customer_id']),
+    # process_reservation_queue: queue of a book in arrival order
+    ('ix_reservation_queue_book_id_created_at', 'reservation_queue', ['book_id', 'created_at']),
+    # exit_reservation_queue: a customer's entry for a book
+    ('ix_reservation_queue_customer_id_book_id', 'reservation_queue', ['customer_id', 'book_id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,44 @@
+"""Add prefix indexes for title and author name autocomplete
+
+Revision ID: 5717875c6293
+Revises: fa6d03f56ebe
+Create Date: 2026-10-18 16:47:20.219001
+
+Postgres only: text_pattern_ops expression indexes on lower(title) and on the
+author full name, matching the prefix LIKE and ORDER BY ... USING ~<~ of
+/books/autocomplete. Built CONCURRENTLY like the other hot-path indexes.
+SQLite cannot use an index for case-insensitive LIKE here and scans instead.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5717875c6293'
+down_revision: Union[str, None] = 'fa6d03f56ebe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_books_title_prefix', 'books', "lower(title) text_pattern_ops"),
+    ('ix_users_name_prefix', 'users', "lower(first_name || ' ' || last_name) text_pattern_ops"),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for name, table, expression in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({expression})")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
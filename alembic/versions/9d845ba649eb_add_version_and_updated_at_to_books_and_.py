@@ -0,0 +1,43 @@
+"""Add version and updated_at to books and authors
+
+Revision ID: 9d845ba649eb
+Revises: 5717875c6293
+Create Date: 2026-10-18 16:50:41.325524
+
+Backs ETag/Last-Modified on the catalog routes. On Postgres 11+ adding a
+column with a constant or stable default is a catalog-only change, no table
+rewrite. SQLite cannot add a column with a non-constant default, so
+updated_at is added nullable there and backfilled.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d845ba649eb'
+down_revision: Union[str, None] = '5717875c6293'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ["books", "authors"]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        op.add_column(table, sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+        if dialect == "sqlite":
+            op.add_column(table, sa.Column("updated_at", sa.DateTime(), nullable=True))
+            op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+        else:
+            op.add_column(table, sa.Column("updated_at", sa.DateTime(), nullable=False,
+                                           server_default=sa.text("timezone('utc', now())")))
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        op.drop_column(table, "updated_at")
+        op.drop_column(table, "version")
@@ -0,0 +1,26 @@
+"""Add books (title, id) index for keyset pagination
+
+Revision ID: 9fb9c1c5a087
+Revises: 23b82ad9e733
+Create Date: 2026-10-18 09:12:04.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9fb9c1c5a087'
+down_revision: Union[str, None] = '23b82ad9e733'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_books_title_id', 'books', ['title', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_books_title_id', table_name='books')
@@ -0,0 +1,34 @@
+"""Add customers.active_reservations
+
+Revision ID: a4d6e2b8f051
+Revises: f3c8d1a7b925
+Create Date: 2026-10-18 21:04:37.190826
+
+Maintained counter of a customer's reservations, checked against the
+membership limit instead of counting reservations on every request.
+Backfilled from the reservations table; `python -m app.cli
+reconcile-reservations` recomputes it later if needed.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d6e2b8f051'
+down_revision: Union[str, None] = 'f3c8d1a7b925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('customers', sa.Column('active_reservations', sa.Integer(), nullable=False, server_default='0'))
+    op.execute(
+        "UPDATE customers SET active_reservations = ("
+        "SELECT count(*) FROM reservations WHERE reservations.customer_id = customers.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('customers', 'active_reservations')
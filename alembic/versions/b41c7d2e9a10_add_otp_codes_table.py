@@ -0,0 +1,37 @@
+"""Add otp_codes table
+
+Revision ID: b41c7d2e9a10
+Revises: 9d845ba649eb
+Create Date: 2026-10-18 17:20:12.504318
+
+Backs the shared OTP store (OTP_BACKEND=database). The expires_at index
+serves the periodic sweep of expired codes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41c7d2e9a10'
+down_revision: Union[str, None] = '9d845ba649eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'otp_codes',
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('code_hash', sa.String(length=64), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('username'),
+    )
+    op.create_index(op.f('ix_otp_codes_expires_at'), 'otp_codes', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_otp_codes_expires_at'), table_name='otp_codes')
+    op.drop_table('otp_codes')
@@ -0,0 +1,38 @@
+"""Add users.token_version and revoked_tokens
+
+Revision ID: c9e2f5a81d37
+Revises: b41c7d2e9a10
+Create Date: 2026-10-18 17:41:03.118274
+
+token_version is compared with the "ver" claim of access tokens; the constant
+server default keeps the ADD COLUMN catalog-only on Postgres 11+.
+revoked_tokens is the jti denylist, pruned by expires_at.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e2f5a81d37'
+down_revision: Union[str, None] = 'b41c7d2e9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='1'))
+    op.create_table(
+        'revoked_tokens',
+        sa.Column('jti', sa.String(length=32), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('jti'),
+    )
+    op.create_index(op.f('ix_revoked_tokens_expires_at'), 'revoked_tokens', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_revoked_tokens_expires_at'), table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,35 @@
+"""Add rate_limits table
+
+Revision ID: d7a3b8c2e415
+Revises: c9e2f5a81d37
+Create Date: 2026-10-18 18:02:47.930561
+
+Backs the shared rate limiter (RATE_LIMIT_BACKEND=database); the tat index
+serves pruning of full buckets.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3b8c2e415'
+down_revision: Union[str, None] = 'c9e2f5a81d37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'rate_limits',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('tat', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index(op.f('ix_rate_limits_tat'), 'rate_limits', ['tat'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_rate_limits_tat'), table_name='rate_limits')
+    op.drop_table('rate_limits')
@@ -0,0 +1,47 @@
+"""Add reservation_queue.priority
+
+Revision ID: e5f1a9c4b702
+Revises: d7a3b8c2e415
+Create Date: 2026-10-18 18:31:55.402817
+
+Replaces the string sort on customers.subscription_model with an explicit
+integer priority (premium 2, plus 1, free 0), backfilled from the customers
+of the rows already waiting. The promotion index (book_id, priority DESC,
+created_at) supersedes ix_reservation_queue_book_id_created_at. Indexes are
+built and dropped CONCURRENTLY on Postgres like the other hot-path indexes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f1a9c4b702'
+down_revision: Union[str, None] = 'd7a3b8c2e415'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('reservation_queue', sa.Column('priority', sa.Integer(), nullable=False, server_default='0'))
+    op.execute(
+        "UPDATE reservation_queue SET priority = CASE ("
+        "SELECT lower(customers.subscription_model) FROM customers WHERE customers.id = reservation_queue.customer_id"
+        ") WHEN 'premium' THEN 2 WHEN 'plus' THEN 1 ELSE 0 END"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reservation_queue_book_id_priority', 'reservation_queue',
+                        ['book_id', sa.text('priority DESC'), 'created_at'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_reservation_queue_book_id_created_at', table_name='reservation_queue',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reservation_queue_book_id_created_at', 'reservation_queue', ['book_id', 'created_at'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_reservation_queue_book_id_priority', table_name='reservation_queue',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('reservation_queue', 'priority')
@@ -0,0 +1,32 @@
+"""Add reservations.end_date index
+
+Revision ID: f3c8d1a7b925
+Revises: e5f1a9c4b702
+Create Date: 2026-10-18 20:12:08.553190
+
+The reservation expiry worker looks up due reservations by end_date, oldest
+first, in bounded batches. Built CONCURRENTLY on Postgres like the other
+hot-path indexes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8d1a7b925'
+down_revision: Union[str, None] = 'e5f1a9c4b702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reservations_end_date', 'reservations', ['end_date'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reservations_end_date', table_name='reservations',
+                      postgresql_concurrently=True, if_exists=True)
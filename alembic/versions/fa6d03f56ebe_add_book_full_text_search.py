@@ -0,0 +1,92 @@
+"""Add full-text search over books and author names
+
+Revision ID: fa6d03f56ebe
+Revises: 1330844311db
+Create Date: 2026-10-18 10:41:19.552306
+
+Postgres: a generated tsvector column on books (title weighted above
+description) with a GIN index, plus a GIN expression index over author names
+on users. Adding the STORED generated column rewrites books under an
+ACCESS EXCLUSIVE lock, so schedule this revision in a maintenance window on
+large catalogs; the indexes themselves are built CONCURRENTLY.
+
+SQLite: an FTS5 table books_fts (rowid = books.id) kept in sync by triggers on
+books and author_book.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fa6d03f56ebe'
+down_revision: Union[str, None] = '1330844311db'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_AUTHOR_NAMES = """
+    (SELECT group_concat(u.first_name || ' ' || u.last_name, ' ')
+     FROM author_book ab JOIN authors a ON a.id = ab.author_id JOIN users u ON u.id = a.user_id
+     WHERE ab.book_id = {book_id})
+"""
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE books_fts USING fts5(title, description, author_names, tokenize = 'porter unicode61')",
+    "INSERT INTO books_fts(rowid, title, description, author_names) "
+    "SELECT b.id, b.title, coalesce(b.description, ''), coalesce(" + SQLITE_AUTHOR_NAMES.format(book_id="b.id") + ", '') FROM books b",
+    "CREATE TRIGGER books_fts_insert AFTER INSERT ON books BEGIN "
+    "INSERT INTO books_fts(rowid, title, description, author_names) "
+    "VALUES (new.id, new.title, coalesce(new.description, ''), coalesce(" + SQLITE_AUTHOR_NAMES.format(book_id="new.id") + ", '')); END",
+    "CREATE TRIGGER books_fts_update AFTER UPDATE OF title, description ON books BEGIN "
+    "UPDATE books_fts SET title = new.title, description = coalesce(new.description, '') WHERE rowid = new.id; END",
+    "CREATE TRIGGER books_fts_delete AFTER DELETE ON books BEGIN "
+    "DELETE FROM books_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER books_fts_author_insert AFTER INSERT ON author_book BEGIN "
+    "UPDATE books_fts SET author_names = coalesce(" + SQLITE_AUTHOR_NAMES.format(book_id="new.book_id") + ", '') WHERE rowid = new.book_id; END",
+    "CREATE TRIGGER books_fts_author_delete AFTER DELETE ON author_book BEGIN "
+    "UPDATE books_fts SET author_names = coalesce(" + SQLITE_AUTHOR_NAMES.format(book_id="old.book_id") + ", '') WHERE rowid = old.book_id; END",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS books_fts_author_delete",
+    "DROP TRIGGER IF EXISTS books_fts_author_insert",
+    "DROP TRIGGER IF EXISTS books_fts_delete",
+    "DROP TRIGGER IF EXISTS books_fts_update",
+    "DROP TRIGGER IF EXISTS books_fts_insert",
+    "DROP TABLE IF EXISTS books_fts",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+        return
+
+    op.execute(
+        "ALTER TABLE books ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+        ") STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_books_search_vector ON books USING gin (search_vector)")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_name_search ON users "
+            "USING gin (to_tsvector('simple', first_name || ' ' || last_name))"
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_name_search")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_books_search_vector")
+    op.execute("ALTER TABLE books DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,103 @@
+"""
+Operational commands that run outside the web process.
+
+    python -m app.cli import-catalog books.csv
+    python -m app.cli import-catalog books.jsonl --batch-size 5000 --checkpoint books.ckpt
+    python -m app.cli expire-reservations
+    python -m app.cli expire-reservations --loop --interval 30
+    python -m app.cli reconcile-reservations --dry-run
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from app.core.config import (
+    BOOK_BULK_CHUNK_SIZE, RESERVATION_EXPIRY_INTERVAL, RESERVATION_EXPIRY_BATCH_SIZE, RESERVATION_EXPIRY_MAX_BATCHES,
+)
+from app.database import SessionLocal
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def import_catalog(args):
+    from app.services.catalog_import import import_books, open_text
+
+    file_format = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+    checkpoint = args.checkpoint or f"{args.path}.checkpoint.json"
+    db = SessionLocal()
+    try:
+        with open_text(args.path) as stream:
+            for summary in import_books(db, stream, file_format, args.batch_size, checkpoint):
+                print(
+                    f"rows={summary['rows_done']} created={summary['created']} "
+                    f"conflicts={summary['conflicts']} invalid={summary['invalid']}",
+                    file=sys.stderr,
+                )
+    finally:
+        db.close()
+    print(json.dumps(summary, indent=2))
+    if summary["finished"] and not args.keep_checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+
+def expire_reservations(args):
+    from app.core.expiry import ReservationExpiryWorker
+
+    worker = ReservationExpiryWorker(SessionLocal, args.interval, args.batch_size, args.max_batches)
+    while True:
+        print(json.dumps(worker.run_once()), flush=True)
+        if not args.loop:
+            return
+        time.sleep(args.interval)
+
+
+def reconcile_reservations(args):
+    from app.services.reservations import reconcile_active_reservations
+
+    db = SessionLocal()
+    try:
+        report = reconcile_active_reservations(db, fix=not args.dry_run)
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2))
+    if args.dry_run and report["drifted"]:
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import-catalog", help="Stream a CSV/JSONL catalog dump into books")
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=["csv", "jsonl"])
+    importer.add_argument("--batch-size", type=positive_int, default=BOOK_BULK_CHUNK_SIZE)
+    importer.add_argument("--checkpoint", help="Progress file used to resume (default: <path>.checkpoint.json)")
+    importer.add_argument("--keep-checkpoint", action="store_true")
+    importer.set_defaults(handler=import_catalog)
+
+    expiry = commands.add_parser("expire-reservations", help="End due reservations, restock and promote waitlists")
+    expiry.add_argument("--batch-size", type=int, default=RESERVATION_EXPIRY_BATCH_SIZE)
+    expiry.add_argument("--max-batches", type=int, default=RESERVATION_EXPIRY_MAX_BATCHES)
+    expiry.add_argument("--loop", action="store_true", help="keep running every --interval seconds")
+    expiry.add_argument("--interval", type=float, default=RESERVATION_EXPIRY_INTERVAL or 60)
+    expiry.set_defaults(handler=expire_reservations)
+
+    reconcile = commands.add_parser("reconcile-reservations",
+                                    help="Recompute customers' active reservation counters and report drift")
+    reconcile.add_argument("--dry-run", action="store_true", help="only report, exit code 1 on drift")
+    reconcile.set_defaults(handler=reconcile_reservations)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
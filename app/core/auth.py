@@ -2,20 +2,23 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime,timedelta
 from jose import jwt,JWTError
-from passlib.context import CryptContext
 from typing import Optional
 from fastapi import Depends, HTTPException,status
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 import random
+import uuid
 from app.database import get_db
+from app.crud import get_principal_async
 from app.models import Customer,User
+from app.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.hashing import pwd_context, password_hasher
+from app.core.otp import create_otp_store
+from app.core.revocation import token_denylist
 from sqlalchemy.orm import Session
 
 load_dotenv()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -29,6 +32,15 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def get_password_hash_async(password):
+    return await password_hasher.hash(password)
+
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Returns (matches, new_hash), see app.core.hashing.PasswordHasher.verify_and_update.
+    """
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
+
 
 # ----------------------------------------
 # Token Handling Functions
@@ -37,8 +49,11 @@ def get_password_hash(password):
 def create_access_token(user: User, expires_delta: Optional[timedelta] = None):
     """
     Generates an access token with user ID instead of username.
+    - "ver": the user's token_version, bumping it revokes every older token.
+    - "jti": unique token id, for revoking this token alone (see app.core.revocation).
     """
     to_encode = {"sub": str(user.id)}  # Store user ID instead of username
+    to_encode.update({"ver": user.token_version, "jti": uuid.uuid4().hex})
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
@@ -57,8 +72,14 @@ def decode_access_token(token: str):
 # User Authentication & Authorization
 # ----------------------------------------
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_principal(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+    """
+    Resolves the bearer token to a cached Principal (user + customer profile).
+    A cache miss costs one joined query; a hit costs none.
+    """
     payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     user_id = payload.get("sub")
 
     if not user_id:
@@ -69,30 +90,49 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid token format")
 
-    # Check if token is revoked
-    if user_id in revoked_tokens:
-        raise HTTPException(status_code=401, detail="User access revoked. Please log in again.")
+    # Revocation checks use the in-memory denylist snapshot and the cached principal: no extra query
+    if payload.get("jti") in token_denylist:
+        raise HTTPException(status_code=401, detail="Token has been revoked. Please log in again.")
 
-    # Retrieve the User object from the database
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    principal = await get_principal_async(db, user_id)
+    if not principal:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
+    # Tokens issued before token_version existed carry no "ver" and count as version 1.
+    # The version comes from the cached principal: the worker that revoked drops its entry
+    # at once, other workers only after PRINCIPAL_CACHE_TTL unless CATALOG_CACHE_NOTIFY is on.
+    if payload.get("ver", 1) != principal.user.token_version:
+        raise HTTPException(status_code=401, detail="User access revoked. Please log in again.")
+
+    return principal
+
+
+async def revoke_token(token: str):
+    """
+    Denies this one token until it expires (needs TOKEN_DENYLIST=true).
+    """
+    payload = decode_access_token(token)
+    if not payload or not payload.get("jti"):
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    if not token_denylist.enabled:
+        raise HTTPException(status_code=501, detail="Token denylist is disabled (TOKEN_DENYLIST=false).")
+    await run_in_threadpool(token_denylist.revoke, payload["jti"], datetime.utcfromtimestamp(payload["exp"]))
 
 
-def get_current_customer(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(principal=Depends(get_current_principal)):
     """
-    Retrieve the currently authenticated customer profile.
+    Retrieve the currently authenticated user (read-only snapshot).
     """
-    current_user = get_current_user(token, db)  # Fetch authenticated user
+    return principal.user
 
-    # Check if the user has a customer profile
-    customer = db.query(Customer).filter(Customer.user_id == current_user.id).first()
 
-    if not customer:
+async def get_current_customer(principal=Depends(get_current_principal)):
+    """
+    Retrieve the currently authenticated customer profile (read-only snapshot).
+    """
+    if not principal.customer:
         raise HTTPException(status_code=403, detail="Only customers can reserve books.")
-    return customer
+    return principal.customer
 
 
 def check_user_role(current_user, allowed_roles: list[str]):
@@ -113,20 +153,25 @@ def check_user_role(current_user, allowed_roles: list[str]):
 def generate_otp():
     return str(random.randint(100000,999999))
 
-# OTP Storage
-otp_store = {}
-
-def save_otp(username: str, otp: str):
-    otp_store[username] = otp
-
-def get_saved_otp(username: str):
-    otp = otp_store.get(username)
-    return otp
+# OTP Storage (memory or database backend, see app.core.otp)
+otp_store = create_otp_store()
 
-def clear_otp(username: str):
-    if username in otp_store:
-        del otp_store[username]
+async def save_otp(username: str, otp: str):
+    if otp_store.blocking:
+        await run_in_threadpool(otp_store.save, username, otp)
+    else:
+        otp_store.save(username, otp)
 
-
-# Token Revocation Storage (Consider storing in DB or Redis for persistence)
-revoked_tokens = set()
\ No newline at end of file
+async def consume_otp(username: str, otp: str) -> bool:
+    """
+    Checks and consumes the user's pending OTP; wrong guesses count towards OTP_MAX_ATTEMPTS.
+    """
+    if otp_store.blocking:
+        return await run_in_threadpool(otp_store.verify, username, otp)
+    return otp_store.verify(username, otp)
+
+async def clear_otp(username: str):
+    if otp_store.blocking:
+        await run_in_threadpool(otp_store.clear, username)
+    else:
+        otp_store.clear(username)
@@ -0,0 +1,133 @@
+import threading
+
+
+class PrefixTrie:
+    """
+    In-process prefix index of (kind, id) -> display text, matched case-insensitively.
+    Every node caches up to `fanout` entries below it, so a lookup walks only the prefix.
+    """
+
+    def __init__(self, fanout: int = 20):
+        self.fanout = fanout
+        self._root = {}
+        self._texts = {}  # (kind, id) -> display text currently indexed
+        self._lock = threading.Lock()
+
+    # Node layout: {"c": {char: node}, "e": entries ending here, "t": best entries in subtree}
+    # An entry is (lowercased text, kind, id, text), so tuples sort alphabetically.
+
+    def _path(self, key: str, create: bool):
+        node = self._root
+        nodes = [node]
+        for char in key:
+            children = node.setdefault("c", {}) if create else node.get("c", {})
+            if char not in children:
+                if not create:
+                    return None
+                children[char] = {}
+            node = children[char]
+            nodes.append(node)
+        return nodes
+
+    def _entries_below(self, node, limit: int):
+        """
+        Rebuilds a node's cached top entries from its subtree.
+        """
+        entries = list(node.get("e", []))
+        for child in node.get("c", {}).values():
+            entries.extend(child.get("t", []))
+        return sorted(set(entries))[:limit]
+
+    def add(self, kind: str, item_id: int, text: str):
+        with self._lock:
+            self._remove_locked(kind, item_id)
+            if not text:
+                return
+            key = text.lower()
+            entry = (key, kind, item_id, text)
+            nodes = self._path(key, create=True)
+            nodes[-1].setdefault("e", []).append(entry)
+            for node in nodes:
+                top = node.setdefault("t", [])
+                if len(top) < self.fanout or entry < top[-1]:
+                    top.append(entry)
+                    top.sort()
+                    del top[self.fanout:]
+            self._texts[(kind, item_id)] = text
+
+    def remove(self, kind: str, item_id: int):
+        with self._lock:
+            self._remove_locked(kind, item_id)
+
+    def _remove_locked(self, kind: str, item_id: int):
+        text = self._texts.pop((kind, item_id), None)
+        if text is None:
+            return
+        key = text.lower()
+        entry = (key, kind, item_id, text)
+        nodes = self._path(key, create=False)
+        nodes[-1]["e"].remove(entry)
+        # Refill caches bottom-up so every node still holds its best `fanout` entries
+        for node in reversed(nodes):
+            if entry in node.get("t", []):
+                node["t"] = self._entries_below(node, self.fanout)
+
+    def search(self, prefix: str, limit: int = 10):
+        nodes = self._path(prefix.lower(), create=False)
+        if not nodes:
+            return []
+        return [
+            {"text": text, "kind": kind, "id": item_id}
+            for _, kind, item_id, text in nodes[-1].get("t", [])[:limit]
+        ]
+
+    def __len__(self):
+        return len(self._texts)
+
+
+class TitleIndex:
+    """
+    Holds the optional process-wide trie. Until it is loaded every hook is a no-op,
+    so write paths pay nothing when the trie is disabled.
+    """
+
+    def __init__(self):
+        self.trie = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.trie is not None
+
+    def load(self, books, authors, fanout: int):
+        """
+        Builds the trie from iterables of (id, title) and (id, author name).
+        """
+        with self._load_lock:
+            if self.trie is not None:
+                return
+            trie = PrefixTrie(fanout)
+            for book_id, title in books:
+                trie.add("book", book_id, title)
+            for author_id, name in authors:
+                trie.add("author", author_id, name)
+            self.trie = trie
+
+    def set_book(self, book_id: int, title: str):
+        if self.trie is not None:
+            self.trie.add("book", book_id, title)
+
+    def remove_book(self, book_id: int):
+        if self.trie is not None:
+            self.trie.remove("book", book_id)
+
+    def set_author(self, author_id: int, name: str):
+        if self.trie is not None:
+            self.trie.add("author", author_id, name)
+
+    def remove_author(self, author_id: int):
+        if self.trie is not None:
+            self.trie.remove("author", author_id)
+
+
+title_index = TitleIndex()
@@ -0,0 +1,225 @@
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.core.config import CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel used to invalidate the catalog cache of other workers
+CATALOG_CHANNEL = "catalog_cache"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire `ttl` seconds after being stored.
+    Safe to share between request threads.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self._version = 0  # bumped by every invalidation, see set()
+        self.listener = None  # InvalidationListener, when cross-worker invalidation is on
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and self.ttl > 0
+
+    def version(self):
+        return self._version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, version=None):
+        """
+        Stores a value. Pass the version() read before loading the value from the
+        database: if anything was invalidated since, the value may be stale and is dropped.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._version += 1
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# Book and author lookups, keyed by ("book", id) / ("author", id)
+catalog_cache = TTLCache(CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL)
+
+
+# ----------------------------------------
+# Write-through invalidation
+# ----------------------------------------
+
+def invalidate_on_commit(db: Session, cache: TTLCache, *keys):
+    """
+    Schedules `keys` to be dropped from `cache` once the session's transaction commits.
+    Dropping after the commit (not before) keeps concurrent readers from re-caching
+    the old row. With cross-worker invalidation on, NOTIFYs are queued in the same
+    transaction, so other workers only hear about committed changes; many keys are
+    split over several payloads below the Postgres size limit.
+    """
+    if not keys:
+        return
+    db.info.setdefault("cache_invalidations", []).append((cache, keys))
+    listener = cache.listener
+    if listener is not None and db.get_bind().dialect.name == "postgresql":
+        for payload in encode_keys(keys):
+            db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                       {"channel": listener.channel, "payload": payload})
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session):
+    for cache, keys in session.info.pop("cache_invalidations", []):
+        cache.invalidate(*keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop("cache_invalidations", None)
+
+
+def encode_keys(keys, limit: int = NOTIFY_PAYLOAD_LIMIT):
+    """
+    Comma-separated "kind:id" payloads, each shorter than `limit` bytes.
+    """
+    payloads, items, size = [], [], 0
+    for kind, key_id in keys:
+        item = f"{kind}:{key_id}"
+        if items and size + len(item) + 1 > limit:
+            payloads.append(",".join(items))
+            items, size = [], 0
+        items.append(item)
+        size += len(item) + 1
+    if items:
+        payloads.append(",".join(items))
+    return payloads
+
+
+def decode_keys(payload: str):
+    keys = []
+    for item in payload.split(","):
+        kind, _, key_id = item.partition(":")
+        if key_id.isdigit():
+            keys.append((kind, int(key_id)))
+    return keys
+
+
+class InvalidationListener:
+    """
+    Background thread that LISTENs on a Postgres channel and invalidates the keys
+    other workers publish in every attached cache (keys are namespaced by kind).
+    Whenever the connection is (re)established the caches are cleared, since
+    notifications sent while disconnected are lost.
+    Needs the psycopg2 driver of the sync engine.
+    """
+
+    def __init__(self, caches: list[TTLCache], engine_factory, channel: str = CATALOG_CHANNEL):
+        self.caches = caches
+        self.engine_factory = engine_factory
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        for cache in self.caches:
+            cache.listener = self
+        self._thread = threading.Thread(target=self._run, name=f"{self.channel}-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        for cache in self.caches:
+            cache.listener = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Cache invalidation listener failed, reconnecting")
+                self._stop.wait(1)
+
+    def _listen(self):
+        raw = self.engine_factory().raw_connection()
+        try:
+            connection = raw.driver_connection
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+            for cache in self.caches:
+                cache.clear()
+            while not self._stop.is_set():
+                if select.select([connection], [], [], 1.0)[0]:
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        keys = decode_keys(notify.payload)
+                        for cache in self.caches:
+                            cache.invalidate(*keys)
+        finally:
+            raw.invalidate()  # the connection carries a LISTEN, never hand it back to the pool
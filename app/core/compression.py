@@ -0,0 +1,138 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip alone is used without it
+    brotli = None
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # Sync flush: a streamed chunk reaches the client now, not when the buffer fills
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def accepted_encodings(accept_encoding: str):
+    """
+    Codings the client accepts (q > 0), lowercased.
+    """
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses of at least `minimum_size` bytes with brotli when the client
+    accepts it (and the brotli package is installed), otherwise gzip.
+    Streaming responses are compressed chunk by chunk and flushed after every chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, gzip_level: int = 6,
+                 brotli_quality: int = 4, enable_brotli: bool = True):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enable_brotli = enable_brotli and brotli is not None
+
+    def _encoder(self, scope: Scope):
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if self.enable_brotli and "br" in accepted:
+            return lambda: _BrotliEncoder(self.brotli_quality)
+        if "gzip" in accepted:
+            return lambda: _GzipEncoder(self.gzip_level)
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoder_factory = self._encoder(scope) if scope["type"] == "http" else None
+        if encoder_factory is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "encoder": None, "passthrough": False}
+
+        async def send_compressed(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                state["start"] = message  # held back until we know whether to compress
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start = state["start"]
+            if start is not None:
+                state["start"] = None
+                headers = MutableHeaders(raw=start["headers"])
+                if "content-encoding" in headers or (not more_body and len(body) < self.minimum_size):
+                    state["passthrough"] = True
+                else:
+                    encoder = state["encoder"] = encoder_factory()
+                    headers["Content-Encoding"] = encoder.name
+                    headers.add_vary_header("Accept-Encoding")
+                    etag = headers.get("etag")
+                    if etag is not None and not etag.startswith("W/"):
+                        # The compressed bytes differ from the identity ones: a strong validator
+                        # would wrongly claim byte equality. is_not_modified() ignores W/.
+                        headers["ETag"] = "W/" + etag
+                    if more_body:
+                        del headers["Content-Length"]
+                    else:
+                        body = encoder.compress(body) + encoder.finish()
+                        headers["Content-Length"] = str(len(body))
+                        message = {**message, "body": body}
+                        await send(start)
+                        await send(message)
+                        return
+                await send(start)
+
+            encoder = state["encoder"]
+            if state["passthrough"] or encoder is None:
+                await send(message)
+                return
+            compressed = encoder.compress(body) + (encoder.flush() if more_body else encoder.finish())
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,72 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+
+def resource_etag(kind: str, item_id: int, version: int) -> str:
+    return f'"{kind}-{item_id}-v{version}"'
+
+
+def list_etag(kind: str, items, *params) -> str:
+    """
+    ETag of a page: the (id, version) pairs of its rows plus the query parameters
+    that shape the body, so any change of membership or content changes the tag.
+    """
+    digest = hashlib.sha1(repr(params).encode())
+    for item in items:
+        digest.update(f"{_get(item, 'id')}:{_get(item, 'version')};".encode())
+    return f'"{kind}-list-{digest.hexdigest()[:20]}"'
+
+
+def last_modified_of(items) -> Optional[datetime]:
+    stamps = [_get(item, "updated_at") for item in items]
+    return max((stamp for stamp in stamps if stamp is not None), default=None)
+
+
+def _get(item, name):
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+def http_date(value: datetime) -> str:
+    # updated_at is stored as naive UTC
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    RFC 9110 evaluation for GET: If-None-Match wins over If-Modified-Since when both are sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have second precision
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime]):
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,3 +13,90 @@ ALGORITHM = "HS256"
 
 # Token expiration settings
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+
+# Bulk book writes: rows per multi-row INSERT statement
+BOOK_BULK_CHUNK_SIZE = int(os.getenv("BOOK_BULK_CHUNK_SIZE", 1000))
+
+# Catalog imports: where uploaded files and resume checkpoints are kept
+CATALOG_IMPORT_DIR = os.getenv("CATALOG_IMPORT_DIR", tempfile.gettempdir())
+
+# Autocomplete: serve /books/autocomplete from an in-process prefix trie instead of the database.
+# The trie is loaded on first use and kept current by this process's own writes only.
+AUTOCOMPLETE_TRIE = os.getenv("AUTOCOMPLETE_TRIE", "false").lower() == "true"
+
+# Catalog cache for single book/author lookups (CATALOG_CACHE_SIZE=0 disables it).
+# CATALOG_CACHE_NOTIFY=true propagates catalog and principal cache invalidations to other
+# workers via Postgres LISTEN/NOTIFY.
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", 10000))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", 30))  # seconds
+CATALOG_CACHE_NOTIFY = os.getenv("CATALOG_CACHE_NOTIFY", "false").lower() == "true"
+
+# Response compression: bodies smaller than COMPRESSION_MIN_SIZE bytes are sent as is.
+# Brotli is used when the client accepts it and the brotli package is installed.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1000))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+COMPRESSION_BROTLI = os.getenv("COMPRESSION_BROTLI", "true").lower() == "true"
+
+# Authenticated principal (user + customer profile) cache; keep the TTL short,
+# it bounds how long another worker may serve a changed role or profile.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 10))  # seconds
+
+# Password hashing: bcrypt cost and the dedicated executor it runs on.
+# PASSWORD_HASH_EXECUTOR is "process" (parallel across cores) or "thread".
+# Requests beyond PASSWORD_HASH_MAX_PENDING running/queued hashes per worker get a 503.
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process").lower()
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+
+# Login OTPs: OTP_BACKEND is "memory" (per process, single worker only) or "database"
+# (otp_codes table, shared by every worker). A code dies after OTP_TTL seconds or
+# OTP_MAX_ATTEMPTS wrong guesses; expired codes are swept every OTP_SWEEP_INTERVAL seconds.
+OTP_BACKEND = os.getenv("OTP_BACKEND", "memory").lower()
+OTP_TTL = float(os.getenv("OTP_TTL", 300))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
+OTP_SWEEP_INTERVAL = float(os.getenv("OTP_SWEEP_INTERVAL", 60))
+
+# Token revocation. Bumping users.token_version revokes all of a user's tokens (checked
+# against the cached principal, so other workers follow within PRINCIPAL_CACHE_TTL unless
+# CATALOG_CACHE_NOTIFY is on). TOKEN_DENYLIST=true also enables revoking single tokens
+# (POST /auth/logout, only registered then); each worker reloads the denylist every
+# TOKEN_DENYLIST_REFRESH_INTERVAL seconds.
+TOKEN_DENYLIST = os.getenv("TOKEN_DENYLIST", "false").lower() == "true"
+TOKEN_DENYLIST_REFRESH_INTERVAL = float(os.getenv("TOKEN_DENYLIST_REFRESH_INTERVAL", 5))
+
+# Rate limiting: "<requests>/<seconds>" per policy, "0" disables one. RATE_LIMIT_BACKEND is
+# "memory" (per process) or "database" (rate_limits table, shared by every worker).
+# Login and OTP requests are limited per client IP and per target username (so rotating
+# addresses does not buy more guesses against one account), reservations per user.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+RATE_LIMIT_LOGIN = os.getenv("RATE_LIMIT_LOGIN", "10/60")
+RATE_LIMIT_REQUEST_OTP = os.getenv("RATE_LIMIT_REQUEST_OTP", "5/60")
+RATE_LIMIT_VERIFY_OTP = os.getenv("RATE_LIMIT_VERIFY_OTP", "10/60")
+RATE_LIMIT_LOGIN_USERNAME = os.getenv("RATE_LIMIT_LOGIN_USERNAME", "10/300")
+# Every new OTP resets the attempt counter, so this also bounds guesses per account
+RATE_LIMIT_REQUEST_OTP_USERNAME = os.getenv("RATE_LIMIT_REQUEST_OTP_USERNAME", "3/300")
+RATE_LIMIT_VERIFY_OTP_USERNAME = os.getenv("RATE_LIMIT_VERIFY_OTP_USERNAME", "10/300")
+RATE_LIMIT_RESERVE = os.getenv("RATE_LIMIT_RESERVE", "30/60")
+
+# Waitlist promotion: queue entries locked and processed per batch when units free up
+QUEUE_PROMOTION_BATCH_SIZE = int(os.getenv("QUEUE_PROMOTION_BATCH_SIZE", 100))
+
+# Reservation expiry: every RESERVATION_EXPIRY_INTERVAL seconds (0 disables the in-process
+# worker, e.g. when `python -m app.cli expire-reservations` runs from cron instead) reservations
+# past their end_date are deleted, their units restocked and the waitlists promoted, at most
+# RESERVATION_EXPIRY_MAX_BATCHES batches of RESERVATION_EXPIRY_BATCH_SIZE per run.
+RESERVATION_EXPIRY_INTERVAL = float(os.getenv("RESERVATION_EXPIRY_INTERVAL", 60))
+RESERVATION_EXPIRY_BATCH_SIZE = int(os.getenv("RESERVATION_EXPIRY_BATCH_SIZE", 500))
+RESERVATION_EXPIRY_MAX_BATCHES = int(os.getenv("RESERVATION_EXPIRY_MAX_BATCHES", 20))
+
+# Idempotency-Key support for the reservation, wallet and membership POSTs: responses are
+# replayed for IDEMPOTENCY_TTL seconds. The response is committed with the request's writes,
+# so a key left unfinished for IDEMPOTENCY_LOCK_TIMEOUT seconds had no effect and a retry may
+# take it over; should the first request still finish, its transaction is rolled back.
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", 86400))
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", 60))
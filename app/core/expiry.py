@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from app.database import SessionLocal
+from app.services.reservations import expire_reservations, reservation_expiry_lag
+from app.core.config import RESERVATION_EXPIRY_INTERVAL, RESERVATION_EXPIRY_BATCH_SIZE, RESERVATION_EXPIRY_MAX_BATCHES
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationExpiryWorker:
+    """
+    Periodically ends reservations past their end_date (see expire_reservations).
+    Each run handles at most `max_batches` batches of `batch_size`, then records the
+    lag: how long the oldest reservation still due has been waiting. A lag that keeps
+    growing means the worker does not keep up (raise the batch size or the limits).
+    Batches are claimed with SKIP LOCKED, so every worker and a cron-driven
+    `python -m app.cli expire-reservations` can run at the same time.
+    """
+
+    def __init__(self, session_factory, interval: float, batch_size: int, max_batches: int):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.expired = 0
+        self.promoted = 0
+        self.runs = 0
+        self.failures = 0
+        self.last_run = None  # summary of the last completed run
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> dict:
+        started = time.monotonic()
+        expired = promoted = batches = 0
+        with self.session_factory() as db:
+            while batches < self.max_batches and not self._stop.is_set():
+                result = expire_reservations(db, self.batch_size)
+                batches += 1
+                expired += result["expired"]
+                promoted += result["promoted"]
+                if result["expired"] < self.batch_size:
+                    break
+            lag = reservation_expiry_lag(db)
+        self.runs += 1
+        self.expired += expired
+        self.promoted += promoted
+        self.last_run = {
+            "finished_at": time.time(),
+            "duration_seconds": round(time.monotonic() - started, 3),
+            "batches": batches,
+            "expired": expired,
+            "promoted": promoted,
+            "lag_seconds": round(lag, 1),
+        }
+        return self.last_run
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "max_batches": self.max_batches,
+            "running": self._thread is not None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "expired": self.expired,
+            "promoted": self.promoted,
+            "last_run": self.last_run,
+        }
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reservation-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                self.failures += 1
+                logger.exception("Reservation expiry run failed")
+
+
+reservation_expiry = ReservationExpiryWorker(
+    SessionLocal, RESERVATION_EXPIRY_INTERVAL, RESERVATION_EXPIRY_BATCH_SIZE, RESERVATION_EXPIRY_MAX_BATCHES,
+)
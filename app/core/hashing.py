@@ -0,0 +1,94 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from app.core.config import (
+    PASSWORD_BCRYPT_ROUNDS, PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING,
+)
+
+# Hashes made with another cost are flagged by needs_update and rehashed on the next login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=PASSWORD_BCRYPT_ROUNDS)
+
+
+# ----------------------------------------
+# Worker functions (run inside the executor, must stay module-level for pickling)
+# ----------------------------------------
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str):
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, size-limited executor so a login burst cannot
+    occupy the threadpool the routes and database calls share.
+    - "process": a process pool, bcrypt runs in parallel on `workers` cores.
+    - "thread": a private thread pool (bcrypt releases the GIL while hashing).
+    At most `max_pending` hashes may be running or queued per worker process;
+    beyond that requests fail fast with 503 instead of piling up latency.
+    """
+
+    def __init__(self, workers: int, max_pending: int, kind: str = "process"):
+        if kind not in ("process", "thread"):
+            raise ValueError("PASSWORD_HASH_EXECUTOR must be 'process' or 'thread'")
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.kind = kind
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Executor = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn: the server already runs threads, which must not be forked.
+                # Like any spawn pool, scripts starting the app need an `if __name__ == "__main__"` guard.
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many authentication requests. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        """
+        Returns (matches, new_hash); new_hash is set when the stored hash uses an
+        outdated cost and should replace it.
+        """
+        return await self._submit(_verify_and_update, password, hashed_password)
+
+    def stats(self):
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_EXECUTOR)
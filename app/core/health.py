@@ -0,0 +1,39 @@
+import os
+from functools import lru_cache
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@lru_cache(maxsize=1)
+def get_migration_heads():
+    """
+    Alembic head revisions shipped with this build (read once from alembic/versions).
+    """
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(os.path.join(PROJECT_ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_ROOT, "alembic"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def check_readiness(db: Session):
+    """
+    Checks that the database is reachable and migrated to the Alembic head.
+    Returns (ready, details).
+    """
+    try:
+        db.execute(text("SELECT 1"))
+    except Exception as e:
+        return False, {"database": f"unreachable: {e.__class__.__name__}"}
+
+    try:
+        current = set(db.execute(text("SELECT version_num FROM alembic_version")).scalars().all())
+    except Exception:
+        return False, {"database": "ok", "migrations": "alembic_version table missing"}
+
+    heads = get_migration_heads()
+    details = {"database": "ok", "migrations": sorted(current), "expected": sorted(heads)}
+    return current == heads, details
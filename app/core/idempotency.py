@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+import orjson
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.database import SessionLocal, run_db
+from app.models import IdempotencyKey
+from app.core.config import IDEMPOTENCY_TTL, IDEMPOTENCY_LOCK_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+KEY_PATTERN = re.compile(r"[\x21-\x7e]{1,255}")  # printable ASCII, no spaces
+
+
+class IdempotencyStore:
+    """
+    Idempotency keys shared by every worker in the idempotency_keys table.
+    - claim() is one indexed read when the key is known (replay or conflict),
+      plus one conditional insert/update when this request gets to run.
+    - complete() stores the response through the request's own session, in the
+      transaction that commits the service's writes: a key is either completed
+      together with its effects or, if the request died, has no effects at all.
+    - release() forgets a request that failed so that it can be retried.
+    Expired rows are pruned through the expires_at index at most once per `prune_interval`.
+    """
+
+    def __init__(self, session_factory, ttl: float, lock_timeout: float, prune_interval: float = 60):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+
+    def _reusable(self, now: datetime):
+        # Expired, or abandoned by a request that died before committing anything
+        return or_(
+            IdempotencyKey.expires_at <= now,
+            and_(IdempotencyKey.status_code.is_(None),
+                 IdempotencyKey.created_at <= now - timedelta(seconds=self.lock_timeout)),
+        )
+
+    def claim(self, key: str, fingerprint: str):
+        """
+        Returns (claimed_at, None) when the caller owns the key and must run the request,
+        otherwise (None, row) with the stored (fingerprint, status_code, response_body);
+        status_code is None while the first request is still running.
+        """
+        now = datetime.utcnow()
+        values = {"fingerprint": fingerprint, "status_code": None, "response_body": None,
+                  "created_at": now, "expires_at": now + timedelta(seconds=self.ttl)}
+        lookup = select(
+            IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response_body,
+            IdempotencyKey.created_at, IdempotencyKey.expires_at,
+        ).where(IdempotencyKey.key == key)
+        with self.session_factory() as db:
+            self._prune(db, now)
+            row = db.execute(lookup).first()
+            if row is None:
+                insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+                claimed = db.execute(
+                    insert(IdempotencyKey).values(key=key, **values)
+                    .on_conflict_do_nothing(index_elements=["key"]).returning(IdempotencyKey.key)
+                ).scalar()
+            elif row.expires_at <= now or (row.status_code is None and
+                                           row.created_at <= now - timedelta(seconds=self.lock_timeout)):
+                claimed = db.execute(
+                    update(IdempotencyKey).where(IdempotencyKey.key == key, self._reusable(now)).values(**values)
+                ).rowcount
+                if claimed and row.status_code is None and row.expires_at > now:
+                    # Safe to run again: complete() commits the response with the writes,
+                    # so a request that never completed never committed anything either
+                    logger.warning("Idempotency key %s was abandoned by a request that did not finish, "
+                                   "running it again", key)
+            else:
+                db.commit()
+                return None, row
+            db.commit()
+            # Lost a race for the same key: report the winner's row
+            return (now, None) if claimed else (None, db.execute(lookup).first())
+
+    @staticmethod
+    def complete(db: Session, key: str, claimed_at: datetime, status_code: int, body: str) -> bool:
+        """
+        Stores the response with the request session `db` and commits it together with
+        the service's pending writes. Returns False, with everything rolled back, when
+        the claim was taken over meanwhile (the request outlived the lock timeout).
+        """
+        db.info.pop("defer_commit", None)
+        stored = db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key, IdempotencyKey.created_at == claimed_at,
+                   IdempotencyKey.status_code.is_(None))
+            .values(status_code=status_code, response_body=body)
+        ).rowcount
+        if not stored:
+            db.rollback()
+            return False
+        db.commit()
+        return True
+
+    def release(self, key: str, claimed_at: datetime):
+        with self.session_factory() as db:
+            db.execute(delete(IdempotencyKey).where(
+                IdempotencyKey.key == key, IdempotencyKey.created_at == claimed_at,
+                IdempotencyKey.status_code.is_(None),
+            ))
+            db.commit()
+
+    def _prune(self, db, now: datetime):
+        if time.monotonic() < self._next_prune:
+            return
+        self._next_prune = time.monotonic() + self.prune_interval
+        db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+
+
+idempotency_store = IdempotencyStore(SessionLocal, IDEMPOTENCY_TTL, IDEMPOTENCY_LOCK_TIMEOUT)
+
+
+def request_fingerprint(request: Request, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (request.method.encode(), request.url.path.encode(), request.url.query.encode(), body):
+        digest.update(len(part).to_bytes(8, "big") + part)
+    return digest.hexdigest()
+
+
+async def idempotent(
+    request: Request,
+    response: Response,
+    db,
+    idempotency_key: Optional[str],
+    user_id: int,
+    handler: Callable[[], Awaitable[object]],
+    status_code: int = 200,
+):
+    """
+    Runs `handler` (returning JSON-serializable content) at most once per user and
+    Idempotency-Key. Retries get the stored response back with Idempotent-Replayed: true,
+    a retry while the first request is still running gets 409, and reusing a key for
+    a different request gets 422. Without the header the handler simply runs.
+    The services' commits only flush while the handler runs; the response is stored
+    and committed with their writes in one transaction (IdempotencyStore.complete).
+    Failed requests (exceptions) are not stored: `db`, the request's session, is rolled
+    back and the key released, so they can be retried with the same key.
+    """
+    headers = dict(response.headers)
+    if idempotency_key is None:
+        return Response(orjson.dumps(await handler()), status_code=status_code,
+                        media_type="application/json", headers=headers)
+    if not KEY_PATTERN.fullmatch(idempotency_key):
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be 1-255 printable ASCII characters.")
+
+    key = f"{user_id}:{idempotency_key}"
+    fingerprint = request_fingerprint(request, await request.body())
+    claimed_at, stored = await run_in_threadpool(idempotency_store.claim, key, fingerprint)
+    if stored is not None:
+        if stored.fingerprint != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request.")
+        if stored.status_code is None:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.",
+                                headers={"Retry-After": "1"})
+        return Response(stored.response_body, status_code=stored.status_code, media_type="application/json",
+                        headers={**headers, "Idempotent-Replayed": "true"})
+
+    db.info["defer_commit"] = True
+    try:
+        body = orjson.dumps(await handler())
+        completed = await run_db(db, idempotency_store.complete, key, claimed_at, status_code, body.decode())
+    except BaseException:
+        db.info.pop("defer_commit", None)
+        await run_db(db, Session.rollback)
+        await run_in_threadpool(idempotency_store.release, key, claimed_at)
+        raise
+    if not completed:
+        raise HTTPException(status_code=409, detail="A retry with this Idempotency-Key took over the request.")
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
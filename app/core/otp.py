@@ -0,0 +1,202 @@
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.database import SessionLocal
+from app.models import OneTimePassword
+from app.core.config import SECRET_KEY, OTP_BACKEND, OTP_TTL, OTP_MAX_ATTEMPTS, OTP_SWEEP_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+def otp_digest(username: str, otp: str) -> str:
+    """
+    Keyed hash of a code, so stored OTPs are useless without SECRET_KEY.
+    """
+    return hmac.new(SECRET_KEY.encode(), f"{username}:{otp}".encode(), hashlib.sha256).hexdigest()
+
+
+class OTPStore(ABC):
+    """
+    One pending OTP per username.
+    - save() replaces any previous code and resets its attempt counter.
+    - verify() consumes the code atomically: a code verifies at most once, and
+      after `max_attempts` wrong guesses (or `ttl` seconds) it is gone.
+    `blocking` tells async callers whether the methods do I/O and belong in the threadpool.
+    """
+    blocking = False
+
+    def __init__(self, ttl: float, max_attempts: int, sweep_interval: float):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    @abstractmethod
+    def save(self, username: str, otp: str):
+        ...
+
+    @abstractmethod
+    def verify(self, username: str, otp: str) -> bool:
+        ...
+
+    @abstractmethod
+    def clear(self, username: str):
+        ...
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """
+        Drops expired codes, returns how many were removed.
+        """
+
+    def start(self):
+        if self.sweep_interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="otp-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("OTP sweep failed")
+
+
+class MemoryOTPStore(OTPStore):
+    """
+    Per-process store: only usable with a single worker.
+    """
+
+    def __init__(self, ttl: float, max_attempts: int, sweep_interval: float):
+        super().__init__(ttl, max_attempts, sweep_interval)
+        self._data = {}  # username -> [digest, expires_at (monotonic), attempts]
+        self._lock = threading.Lock()
+
+    def save(self, username: str, otp: str):
+        entry = [otp_digest(username, otp), time.monotonic() + self.ttl, 0]
+        with self._lock:
+            self._data[username] = entry
+
+    def verify(self, username: str, otp: str) -> bool:
+        digest = otp_digest(username, otp)
+        with self._lock:
+            entry = self._data.get(username)
+            if entry is None:
+                return False
+            if entry[1] <= time.monotonic():
+                del self._data[username]
+                return False
+            if hmac.compare_digest(entry[0], digest):
+                del self._data[username]
+                return True
+            entry[2] += 1
+            if entry[2] >= self.max_attempts:
+                del self._data[username]
+            return False
+
+    def clear(self, username: str):
+        with self._lock:
+            self._data.pop(username, None)
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [username for username, entry in self._data.items() if entry[1] <= now]
+            for username in expired:
+                del self._data[username]
+        return len(expired)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DatabaseOTPStore(OTPStore):
+    """
+    Store shared by every worker, backed by the otp_codes table on the primary.
+    Each method is one short transaction; verification is a single conditional DELETE.
+    """
+    blocking = True
+
+    def __init__(self, session_factory, ttl: float, max_attempts: int, sweep_interval: float):
+        super().__init__(ttl, max_attempts, sweep_interval)
+        self.session_factory = session_factory
+
+    def save(self, username: str, otp: str):
+        values = {
+            "username": username,
+            "code_hash": otp_digest(username, otp),
+            "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl),
+            "attempts": 0,
+        }
+        with self.session_factory() as db:
+            dialect = db.get_bind().dialect.name
+            if dialect in ("postgresql", "sqlite"):
+                insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                stmt = insert(OneTimePassword).values(**values)
+                db.execute(stmt.on_conflict_do_update(
+                    index_elements=["username"],
+                    set_={key: stmt.excluded[key] for key in ("code_hash", "expires_at", "attempts")},
+                ))
+            else:
+                db.execute(delete(OneTimePassword).where(OneTimePassword.username == username))
+                db.add(OneTimePassword(**values))
+            db.commit()
+
+    def verify(self, username: str, otp: str) -> bool:
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            # Verify and consume in one statement: two racing requests cannot both succeed
+            consumed = db.execute(delete(OneTimePassword).where(
+                OneTimePassword.username == username,
+                OneTimePassword.code_hash == otp_digest(username, otp),
+                OneTimePassword.expires_at > now,
+                OneTimePassword.attempts < self.max_attempts,
+            )).rowcount
+            if not consumed:
+                db.execute(
+                    update(OneTimePassword)
+                    .where(OneTimePassword.username == username)
+                    .values(attempts=OneTimePassword.attempts + 1)
+                )
+                db.execute(delete(OneTimePassword).where(
+                    OneTimePassword.username == username,
+                    or_(OneTimePassword.attempts >= self.max_attempts, OneTimePassword.expires_at <= now),
+                ))
+            db.commit()
+        return bool(consumed)
+
+    def clear(self, username: str):
+        with self.session_factory() as db:
+            db.execute(delete(OneTimePassword).where(OneTimePassword.username == username))
+            db.commit()
+
+    def sweep(self) -> int:
+        with self.session_factory() as db:
+            removed = db.execute(
+                delete(OneTimePassword).where(OneTimePassword.expires_at <= datetime.utcnow())
+            ).rowcount
+            db.commit()
+        return removed
+
+
+def create_otp_store() -> OTPStore:
+    if OTP_BACKEND == "memory":
+        return MemoryOTPStore(OTP_TTL, OTP_MAX_ATTEMPTS, OTP_SWEEP_INTERVAL)
+    if OTP_BACKEND == "database":
+        return DatabaseOTPStore(SessionLocal, OTP_TTL, OTP_MAX_ATTEMPTS, OTP_SWEEP_INTERVAL)
+    raise ValueError("OTP_BACKEND must be 'memory' or 'database'")
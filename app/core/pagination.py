@@ -0,0 +1,95 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import func, text, tuple_
+from sqlalchemy.orm import Query, Session
+
+
+def encode_cursor(sort: str, value, row_id: int) -> str:
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, column):
+    """
+    Returns (sort_value, id) from an opaque cursor, coerced to the column's Python type.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort:
+            raise ValueError("cursor was issued for a different sort")
+        python_type = column.type.python_type
+        if value is not None and python_type in (date, datetime):
+            value = python_type.fromisoformat(value)
+        elif value is not None:
+            value = python_type(value)
+        return value, int(row_id)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query: Query, model, sort: str, sort_keys: dict, skip: int = 0, limit: int = 10,
+             cursor: Optional[str] = None):
+    """
+    Deterministically ordered page of `query`.
+    - With a cursor (or skip=0): keyset pagination on (sort_key, id), cost independent of depth.
+    - With skip > 0 and no cursor: legacy offset pagination, kept as a fallback.
+    """
+    if sort not in sort_keys:
+        raise HTTPException(status_code=400, detail=f"Invalid sort key. Allowed: {', '.join(sort_keys)}")
+    column = sort_keys[sort]
+
+    if column is model.id:
+        query = query.order_by(model.id)
+        if cursor:
+            _, last_id = decode_cursor(cursor, sort, column)
+            query = query.filter(model.id > last_id)
+    else:
+        query = query.order_by(column, model.id)
+        if cursor:
+            last_value, last_id = decode_cursor(cursor, sort, column)
+            query = query.filter(tuple_(column, model.id) > tuple_(last_value, last_id))
+
+    if skip and not cursor:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+
+def next_cursor(items, sort: str, limit: int):
+    """
+    Cursor for the page after `items`, or None when this was the last page.
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(sort, getattr(last, sort), last.id)
+
+
+def estimate_count(db: Session, model) -> int:
+    """
+    Cheap row count: planner statistics on Postgres, COUNT(*) elsewhere.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"),
+            {"table": model.__tablename__},
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    return db.query(func.count(model.id)).scalar()
+
+
+def set_pagination_headers(response: Response, items, sort: str, limit: int, total: Optional[int] = None):
+    """
+    Pagination metadata travels in headers so list bodies keep their existing shape.
+    """
+    cursor = next_cursor(items, sort, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    if total is not None:
+        response.headers["X-Total-Count-Estimate"] = str(total)
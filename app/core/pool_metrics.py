@@ -0,0 +1,149 @@
+import time
+import threading
+from bisect import bisect_left
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +Inf)
+BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram, safe to update from pool threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        with self._lock:
+            self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self):
+        with self._lock:
+            count = sum(self.counts)
+            labels = [f"le_{b}ms" for b in BUCKETS_MS] + ["le_inf"]
+            return {
+                "count": count,
+                "avg_ms": round(self.total_ms / count, 3) if count else 0.0,
+                "max_ms": round(self.max_ms, 3),
+                "buckets": dict(zip(labels, self.counts)),
+            }
+
+
+class PoolMetrics:
+    """
+    Counters and histograms for one connection pool.
+    - wait: time spent acquiring a connection from the pool (includes queueing).
+    - hold: time a connection stays checked out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait = Histogram()
+        self.hold = Histogram()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+class _TimedConnectMixin:
+    """
+    Measures how long callers wait for Pool.connect(), i.e. how long requests queue for a connection.
+    """
+
+    metrics: PoolMetrics = None
+
+    def connect(self):
+        if self.metrics is None:
+            return super().connect()
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.metrics.incr("timeouts")
+            raise
+        finally:
+            self.metrics.wait.observe((time.perf_counter() - start) * 1000)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep accumulating into the same metrics
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
+
+
+class InstrumentedQueuePool(_TimedConnectMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedConnectMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine):
+    """
+    Attaches PoolMetrics to an engine's pool through SQLAlchemy pool events.
+    """
+    pool = engine.pool
+    metrics = getattr(pool, "metrics", None) or PoolMetrics()
+    pool.metrics = metrics
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.incr("connects")
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.incr("checkouts")
+        connection_record.info["checkout_at"] = time.perf_counter()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checkout_at", None)
+        if started is not None:
+            metrics.hold.observe((time.perf_counter() - started) * 1000)
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr("invalidations")
+
+    return metrics
+
+
+def pool_status(engine):
+    """
+    Live pool occupancy plus the collected metrics for an engine.
+    """
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics:
+        status.update({
+            "checkouts": metrics.checkouts,
+            "connects": metrics.connects,
+            "invalidations": metrics.invalidations,
+            "timeouts": metrics.timeouts,
+            "wait_ms": metrics.wait.snapshot(),
+            "hold_ms": metrics.hold.snapshot(),
+        })
+    return status
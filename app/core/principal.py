@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+from app.core.cache import TTLCache
+from app.core.config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL
+
+
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """
+    Read-only view of the authenticated user, detached from any session.
+    """
+    id: int
+    username: str
+    first_name: str
+    last_name: str
+    email: str
+    phone: Optional[str]
+    user_role: str
+    token_version: int
+
+
+@dataclass(frozen=True, slots=True)
+class CurrentCustomer:
+    """
+    Read-only view of the authenticated user's customer profile. Wallet and
+    membership values may be up to PRINCIPAL_CACHE_TTL seconds old: services that
+    act on them load the customer row in their own transaction.
+    """
+    id: int
+    user_id: int
+    subscription_model: str
+    subscription_end_time: Optional[date]
+    wallet_money_amount: float
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    user: CurrentUser
+    customer: Optional[CurrentCustomer]
+
+
+def build_principal(user, customer) -> Principal:
+    return Principal(
+        user=CurrentUser(
+            id=user.id, username=user.username, first_name=user.first_name, last_name=user.last_name,
+            email=user.email, phone=user.phone, user_role=user.user_role, token_version=user.token_version,
+        ),
+        customer=CurrentCustomer(
+            id=customer.id, user_id=customer.user_id, subscription_model=customer.subscription_model,
+            subscription_end_time=customer.subscription_end_time,
+            wallet_money_amount=customer.wallet_money_amount,
+        ) if customer is not None else None,
+    )
+
+
+def principal_key(user_id: int):
+    return ("principal", user_id)
+
+
+# Authenticated principals by user id, see app.core.auth.get_current_principal
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
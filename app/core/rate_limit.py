@@ -0,0 +1,228 @@
+import math
+import threading
+import time
+from typing import NamedTuple
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from starlette.concurrency import run_in_threadpool
+from app.database import SessionLocal
+from app.models import RateLimitState
+from app.core.auth import get_current_principal
+from app.core.config import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_BACKEND, RATE_LIMIT_MAX_KEYS, RATE_LIMIT_LOGIN, RATE_LIMIT_REQUEST_OTP,
+    RATE_LIMIT_RESERVE, RATE_LIMIT_VERIFY_OTP, RATE_LIMIT_LOGIN_USERNAME, RATE_LIMIT_REQUEST_OTP_USERNAME,
+    RATE_LIMIT_VERIFY_OTP_USERNAME,
+)
+
+
+class RatePolicy(NamedTuple):
+    """
+    `limit` requests per `period` seconds, with bursts of up to `limit`.
+    """
+    name: str
+    limit: int
+    period: float
+
+    @property
+    def interval(self):
+        return self.period / self.limit
+
+
+def parse_policy(name: str, value: str):
+    """
+    "10/60" -> 10 requests per 60 seconds. Empty or "0" disables the policy.
+    """
+    if not value or value.strip() == "0":
+        return None
+    limit, _, period = value.partition("/")
+    policy = RatePolicy(name, int(limit), float(period or 1))
+    if policy.limit <= 0 or policy.period <= 0:
+        raise ValueError(f"Invalid rate limit for {name}: {value!r}")
+    return policy
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    reset_after: float  # seconds until the bucket is full again
+    retry_after: float  # seconds until the next request is allowed (0 when allowed)
+
+
+def _result(policy: RatePolicy, now: float, tat: float, allowed: bool):
+    """
+    GCRA bookkeeping: `tat` (theoretical arrival time) is the moment the bucket
+    is full again, a request fits while tat - period <= now.
+    """
+    if allowed:
+        remaining = int((now - (tat - policy.period)) // policy.interval)
+        return RateLimitResult(True, max(remaining, 0), max(tat - now, 0.0), 0.0)
+    return RateLimitResult(False, 0, max(tat - now, 0.0), max(tat + policy.interval - policy.period - now, 0.0))
+
+
+class MemoryRateLimiter:
+    """
+    Per-process token buckets (GCRA: one float per key). Only exact with a single worker.
+    When more than `max_keys` keys are tracked, full buckets are dropped first.
+    """
+    blocking = False
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._tats = {}
+        self._lock = threading.Lock()
+
+    def hit(self, policy: RatePolicy, key: str) -> RateLimitResult:
+        now = time.monotonic()
+        with self._lock:
+            tat = max(self._tats.get(key, now), now) + policy.interval
+            if tat - policy.period > now:
+                return _result(policy, now, tat - policy.interval, False)
+            if key not in self._tats and len(self._tats) >= self.max_keys:
+                self._prune(now)
+            self._tats[key] = tat
+        return _result(policy, now, tat, True)
+
+    def _prune(self, now: float):
+        for key in [key for key, tat in self._tats.items() if tat <= now]:
+            del self._tats[key]
+        while len(self._tats) >= self.max_keys:
+            del self._tats[next(iter(self._tats))]  # oldest inserted
+
+    def __len__(self):
+        return len(self._tats)
+
+
+class DatabaseRateLimiter:
+    """
+    Token buckets shared by every worker in the rate_limits table: an allowed
+    request is a single conditional upsert, a rejected one adds a read for the
+    Retry-After value. Full buckets are pruned at most once per `prune_interval`.
+    """
+    blocking = True
+
+    def __init__(self, session_factory, prune_interval: float = 60):
+        self.session_factory = session_factory
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+
+    def hit(self, policy: RatePolicy, key: str) -> RateLimitResult:
+        now = time.time()  # shared between workers, so wall clock
+        with self.session_factory() as db:
+            dialect = db.get_bind().dialect.name
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            greatest = func.greatest if dialect == "postgresql" else func.max
+            new_tat = greatest(RateLimitState.tat, now) + policy.interval
+            stmt = insert(RateLimitState).values(key=key, tat=now + policy.interval)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"],
+                set_={"tat": new_tat},
+                where=new_tat - policy.period <= now,
+            ).returning(RateLimitState.tat)
+            tat = db.execute(stmt).scalar()  # None when the WHERE rejected the update
+            allowed = tat is not None
+            if not allowed:
+                tat = db.execute(select(RateLimitState.tat).where(RateLimitState.key == key)).scalar()
+            if now >= self._next_prune:
+                self._next_prune = now + self.prune_interval
+                db.execute(delete(RateLimitState).where(RateLimitState.tat <= now))
+            db.commit()
+        return _result(policy, now, tat, allowed)
+
+
+def create_rate_limiter():
+    if RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimiter(RATE_LIMIT_MAX_KEYS)
+    if RATE_LIMIT_BACKEND == "database":
+        return DatabaseRateLimiter(SessionLocal)
+    raise ValueError("RATE_LIMIT_BACKEND must be 'memory' or 'database'")
+
+
+rate_limiter = create_rate_limiter()
+
+# Per-route policies, see RATE_LIMIT_* in app.core.config
+LOGIN_LIMIT = parse_policy("login", RATE_LIMIT_LOGIN)
+REQUEST_OTP_LIMIT = parse_policy("request_otp", RATE_LIMIT_REQUEST_OTP)
+RESERVE_LIMIT = parse_policy("reserve", RATE_LIMIT_RESERVE)
+VERIFY_OTP_LIMIT = parse_policy("verify_otp", RATE_LIMIT_VERIFY_OTP)
+LOGIN_USERNAME_LIMIT = parse_policy("login_username", RATE_LIMIT_LOGIN_USERNAME)
+REQUEST_OTP_USERNAME_LIMIT = parse_policy("request_otp_username", RATE_LIMIT_REQUEST_OTP_USERNAME)
+VERIFY_OTP_USERNAME_LIMIT = parse_policy("verify_otp_username", RATE_LIMIT_VERIFY_OTP_USERNAME)
+
+
+def rate_limit_headers(policy: RatePolicy, result: RateLimitResult):
+    headers = {
+        "RateLimit-Limit": str(policy.limit),
+        "RateLimit-Remaining": str(result.remaining),
+        "RateLimit-Reset": str(math.ceil(result.reset_after)),
+        "RateLimit-Policy": f"{policy.limit};w={int(policy.period)}",
+    }
+    if not result.allowed:
+        headers["Retry-After"] = str(max(math.ceil(result.retry_after), 1))
+    return headers
+
+
+async def check_rate_limit(policy: RatePolicy, key: str, response: Response = None):
+    """
+    Counts one request against `key`; raises 429 with Retry-After when the bucket
+    is empty, otherwise sets the RateLimit-* headers on `response`.
+    """
+    key = f"{policy.name}:{key}"
+    if rate_limiter.blocking:
+        result = await run_in_threadpool(rate_limiter.hit, policy, key)
+    else:
+        result = rate_limiter.hit(policy, key)
+    headers = rate_limit_headers(policy, result)
+    if not result.allowed:
+        raise HTTPException(status_code=429, detail="Too many requests. Please retry later.", headers=headers)
+    if response is not None:
+        response.headers.update(headers)
+    return result
+
+
+def limit_by_ip(policy: RatePolicy):
+    """
+    Route dependency limiting each client address (see uvicorn --proxy-headers behind a proxy).
+    """
+    async def dependency(request: Request, response: Response):
+        if policy is None or not RATE_LIMIT_ENABLED:
+            return None
+        host = request.client.host if request.client else "unknown"
+        return await check_rate_limit(policy, f"ip:{host}", response)
+
+    return dependency
+
+
+def limit_by_username(policy: RatePolicy):
+    """
+    Route dependency limiting each target account of an unauthenticated route, by the
+    "username" query parameter or JSON body field. Requests without one are left to
+    the route's validation.
+    """
+    async def dependency(request: Request, response: Response):
+        if policy is None or not RATE_LIMIT_ENABLED:
+            return None
+        username = request.query_params.get("username")
+        if username is None:
+            try:
+                body = await request.json()
+            except ValueError:
+                body = None
+            username = body.get("username") if isinstance(body, dict) else None
+        if not isinstance(username, str) or not username:
+            return None
+        return await check_rate_limit(policy, f"username:{username.lower()}", response)
+
+    return dependency
+
+
+def limit_by_user(policy: RatePolicy):
+    """
+    Route dependency limiting each authenticated user.
+    """
+    async def dependency(response: Response, principal=Depends(get_current_principal)):
+        if policy is None or not RATE_LIMIT_ENABLED:
+            return None
+        return await check_rate_limit(policy, f"user:{principal.user.id}", response)
+
+    return dependency
@@ -0,0 +1,82 @@
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from app.database import SessionLocal
+from app.models import RevokedToken
+from app.core.config import TOKEN_DENYLIST, TOKEN_DENYLIST_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class TokenDenylist:
+    """
+    jti denylist shared through the revoked_tokens table.
+    Lookups hit an in-memory snapshot only; a background thread reloads it every
+    `refresh_interval` seconds and prunes rows of tokens that have expired anyway.
+    Tokens revoked by this worker are denied immediately, by other workers after
+    at most one refresh interval.
+    """
+
+    def __init__(self, session_factory, refresh_interval: float, enabled: bool = True):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.enabled = enabled
+        self._jtis = frozenset()
+        self._local = {}  # jti -> expires_at, revoked here; survives a refresh that raced the insert
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __contains__(self, jti) -> bool:
+        return jti in self._jtis
+
+    def __len__(self):
+        return len(self._jtis)
+
+    def revoke(self, jti: str, expires_at: datetime):
+        with self.session_factory() as db:
+            db.add(RevokedToken(jti=jti, expires_at=expires_at))
+            try:
+                db.commit()
+            except IntegrityError:  # already revoked
+                db.rollback()
+        with self._lock:
+            self._local[jti] = expires_at
+            self._jtis = self._jtis | {jti}
+
+    def refresh(self):
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+            jtis = set(db.scalars(select(RevokedToken.jti).where(RevokedToken.expires_at > now)))
+            db.commit()
+        with self._lock:
+            self._local = {jti: expires_at for jti, expires_at in self._local.items() if expires_at > now}
+            self._jtis = frozenset(jtis | self._local.keys())
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="token-denylist", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Token denylist refresh failed")
+            if self._stop.wait(self.refresh_interval):
+                return
+
+
+token_denylist = TokenDenylist(SessionLocal, TOKEN_DENYLIST_REFRESH_INTERVAL, enabled=TOKEN_DENYLIST)
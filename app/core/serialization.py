@@ -0,0 +1,28 @@
+from functools import lru_cache
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema) -> TypeAdapter:
+    """
+    Compiled validator/serializer for list[schema], built once per schema.
+    """
+    return TypeAdapter(list[schema])
+
+
+def json_list_response(schema, items, response: Response = None) -> Response:
+    """
+    Fast path for large list bodies: ORM rows are validated with `from_attributes`
+    and dumped to JSON bytes in one pass by pydantic-core, skipping FastAPI's
+    per-item response_model processing. Headers set on the injected `response`
+    (pagination, ETag, ...) are carried over.
+    """
+    adapter = list_adapter(schema)
+    body = adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+    result = Response(content=body, media_type="application/json")
+    if response is not None:
+        for name, value in response.headers.items():
+            if name not in ("content-length", "content-type"):
+                result.headers.append(name, value)
+    return result
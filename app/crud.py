@@ -1,17 +1,53 @@
-from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import Optional
+from datetime import datetime
+from app.database import run_db
+from app.core.pagination import paginate, estimate_count
+from app.core.config import BOOK_BULK_CHUNK_SIZE
+from app.core.autocomplete import title_index
+from app.core.cache import MISSING, catalog_cache, invalidate_on_commit
+from app.core.principal import build_principal, principal_cache, principal_key
+from sqlalchemy.dialects import postgresql, sqlite
 from app.models import User,Book,Author,Reservation,Customer
 from app.schemas import UserCreate, BookCreate, BookUpdate, AuthorCreate, AuthorUpdate, ReservationCreate, \
     ReservationUpdate, CustomerCreate, CustomerUpdate
 CustomerUpdate
 
+# Allowed sort keys for keyset pagination, each paired with id as tie-breaker
+USER_SORT_KEYS = {"id": User.id, "username": User.username}
+BOOK_SORT_KEYS = {"id": Book.id, "title": Book.title}
+AUTHOR_SORT_KEYS = {"id": Author.id}
+RESERVATION_SORT_KEYS = {"id": Reservation.id}
+CUSTOMER_SORT_KEYS = {"id": Customer.id}
+
+# Relationship loading per endpoint, so response serialization never lazy loads.
+# AuthorResponse only needs the ids of an author's books.
+# - lists: selectinload, one extra IN query per page whatever the page size
+# - detail: joinedload, the author and its book ids in a single query
+AUTHOR_LIST_OPTIONS = (selectinload(Author.books).load_only(Book.id),)
+AUTHOR_DETAIL_OPTIONS = (joinedload(Author.books).load_only(Book.id),)
+
 def get_user_id(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
+def get_principal(db: Session, user_id: int):
+    """
+    The user and its customer profile (if any) in one joined query, as an immutable snapshot.
+    """
+    row = (
+        db.query(User, Customer)
+        .outerjoin(Customer, Customer.user_id == User.id)
+        .filter(User.id == user_id)
+        .first()
+    )
+    return build_principal(*row) if row else None
+
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
-def get_all_users(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(User).offset(skip).limit(limit).all() # These parameters enable pagination
+def get_all_users(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, sort: str = "id"):
+    return paginate(db.query(User), User, sort, USER_SORT_KEYS, skip=skip, limit=limit, cursor=cursor)
 
 def create_user(db: Session, user: UserCreate):
     db_user = User(
@@ -34,8 +70,12 @@ def update_user(db: Session, user_id: int, updates: dict):
         return None
     for key, value in updates.items():
         setattr(db_user, key, value)
+    invalidate_on_commit(db, principal_cache, principal_key(user_id))
     db.commit()
     db.refresh(db_user)
+    if title_index.loaded and ("first_name" in updates or "last_name" in updates):
+        for author in db_user.author_profile:
+            title_index.set_author(author.id, f"{db_user.first_name} {db_user.last_name}")
     return db_user
 
 
@@ -43,6 +83,9 @@ def delete_user(db: Session, user_id: int):
     db_user = get_user_id(db, user_id)
     if not db_user:
         return None
+    for author in db_user.author_profile:
+        _forget_author(db, author.id)
+    invalidate_on_commit(db, principal_cache, principal_key(user_id))
     db.delete(db_user)
     db.commit()
     return db_user
@@ -52,10 +95,125 @@ def create_book(db: Session, book: BookCreate):
     db.add(db_book)
     db.commit()
     db.refresh(db_book)
+    title_index.set_book(db_book.id, db_book.title)
     return db_book
 
-def get_all_books(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(Book).offset(skip).limit(limit).all()
+# Keeps each multi-row INSERT under the 32k bind-parameter limit of asyncpg/SQLite
+MAX_BULK_CHUNK_SIZE = 4000
+
+def _upsert_insert(db: Session, model):
+    """
+    Dialect specific INSERT that supports ON CONFLICT ... RETURNING.
+    Only PostgreSQL and SQLite have one; other databases get a 501 before anything is written.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise HTTPException(status_code=501, detail=f"Bulk book writes are not supported on {dialect} databases.")
+
+def _prepare_bulk_books(db: Session, books: list[BookCreate], results: list, chunk_size: int):
+    """
+    Marks rows that cannot be written and yields the rest in chunks of (index, row) pairs.
+    """
+    rows = [book.dict() for book in books]
+    author_ids = {row["author_id"] for row in rows}
+    known_authors = {a for (a,) in db.query(Author.id).filter(Author.id.in_(author_ids))}
+    valid = []
+    for index, row in enumerate(rows):
+        if row["author_id"] not in known_authors:
+            results[index] = {"index": index, "isbn": row["isbn"], "id": None, "status": "invalid_author"}
+        else:
+            valid.append((index, row))
+    chunk_size = max(1, min(chunk_size, MAX_BULK_CHUNK_SIZE))
+    for start in range(0, len(valid), chunk_size):
+        yield valid[start:start + chunk_size]
+
+def _index_bulk_titles(books: list[BookCreate], results: list):
+    for result in results:
+        if result["status"] in ("created", "updated"):
+            title_index.set_book(result["id"], books[result["index"]].title)
+
+def _forget_author(db: Session, author_id: int):
+    """
+    Drops an author and their books (removed by ON DELETE CASCADE) from the
+    catalog cache and the autocomplete trie.
+    """
+    book_ids = [book_id for (book_id,) in db.query(Book.id).filter(Book.author_id == author_id)]
+    invalidate_on_commit(db, catalog_cache, ("author", author_id), *[("book", book_id) for book_id in book_ids])
+    title_index.remove_author(author_id)
+    for book_id in book_ids:
+        title_index.remove_book(book_id)
+
+def bulk_create_books(db: Session, books: list[BookCreate], chunk_size: int = BOOK_BULK_CHUNK_SIZE):
+    """
+    Inserts books with one multi-row INSERT ... ON CONFLICT (isbn) DO NOTHING per chunk,
+    all in a single transaction. Existing ISBNs are reported as conflicts, not errors.
+    """
+    results = [None] * len(books)
+    for chunk in _prepare_bulk_books(db, books, results, chunk_size):
+        stmt = (
+            _upsert_insert(db, Book)
+            .values([row for _, row in chunk])
+            .on_conflict_do_nothing(index_elements=["isbn"])
+            .returning(Book.id, Book.isbn)
+        )
+        inserted = {isbn: book_id for book_id, isbn in db.execute(stmt)}
+        for index, row in chunk:
+            # pop: a repeated ISBN inside the request only counts as created once
+            book_id = inserted.pop(row["isbn"], None)
+            results[index] = {
+                "index": index, "isbn": row["isbn"], "id": book_id,
+                "status": "created" if book_id else "conflict",
+            }
+    db.commit()
+    _index_bulk_titles(books, results)
+    return results
+
+def bulk_upsert_books(db: Session, books: list[BookCreate], chunk_size: int = BOOK_BULK_CHUNK_SIZE):
+    """
+    Inserts or updates books by ISBN with INSERT ... ON CONFLICT (isbn) DO UPDATE per chunk,
+    all in a single transaction. When an ISBN repeats in the request the last row wins.
+    """
+    results = [None] * len(books)
+    last_by_isbn = {book.isbn: index for index, book in enumerate(books)}
+    for chunk in _prepare_bulk_books(db, books, results, chunk_size):
+        writes = []
+        for index, row in chunk:
+            if last_by_isbn[row["isbn"]] != index:
+                results[index] = {"index": index, "isbn": row["isbn"], "id": None, "status": "duplicate"}
+            else:
+                writes.append((index, row))
+        if not writes:
+            continue
+        isbns = [row["isbn"] for _, row in writes]
+        existing = {isbn for (isbn,) in db.query(Book.isbn).filter(Book.isbn.in_(isbns))}
+        stmt = _upsert_insert(db, Book).values([row for _, row in writes])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["isbn"],
+            set_={
+                **{key: stmt.excluded[key] for key in writes[0][1] if key != "isbn"},
+                # Column.onupdate does not apply to ON CONFLICT DO UPDATE
+                "version": Book.version + 1,
+                "updated_at": datetime.utcnow(),
+            },
+        ).returning(Book.id, Book.isbn)
+        written = {isbn: book_id for book_id, isbn in db.execute(stmt)}
+        for index, row in writes:
+            results[index] = {
+                "index": index, "isbn": row["isbn"], "id": written.get(row["isbn"]),
+                "status": "updated" if row["isbn"] in existing else "created",
+            }
+    invalidate_on_commit(db, catalog_cache, *[
+        ("book", result["id"]) for result in results if result and result["status"] == "updated"
+    ])
+    db.commit()
+    _index_bulk_titles(books, results)
+    return results
+
+def get_all_books(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, sort: str = "id"):
+    return paginate(db.query(Book), Book, sort, BOOK_SORT_KEYS, skip=skip, limit=limit, cursor=cursor)
 
 def get_book_by_id(db: Session, book_id: int):
     return db.query(Book).filter(Book.id == book_id).first()
@@ -66,16 +224,26 @@ def update_book(db: Session, book_id: int, updates: BookUpdate):
         return None
     for key, value in updates.dict(exclude_unset=True).items():
         setattr(db_book, key, value)
+    invalidate_on_commit(db, catalog_cache, ("book", book_id))
     db.commit()
     db.refresh(db_book)
+    title_index.set_book(db_book.id, db_book.title)
     return db_book
 
 def delete_book(db: Session, book_id: int):
     db_book = get_book_by_id(db, book_id)
     if not db_book:
         return None
+    # the author's `books` list changes too
+    author_ids = [author.id for author in db_book.authors]
+    invalidate_on_commit(db, catalog_cache, ("book", book_id), *[("author", a) for a in author_ids])
+    if author_ids:
+        db.query(Author).filter(Author.id.in_(author_ids)).update(
+            {Author.version: Author.version + 1}, synchronize_session=False
+        )
     db.delete(db_book)
     db.commit()
+    title_index.remove_book(book_id)
     return db_book
 
 
@@ -83,14 +251,34 @@ def create_author(db: Session, author: AuthorCreate):
     db_author = Author(**author.dict())
     db.add(db_author)
     db.commit()
-    db.refresh(db_author)
+    db_author = get_author_by_id(db, db_author.id)  # reload with its books for AuthorResponse
+    if title_index.loaded:
+        title_index.set_author(db_author.id, f"{db_author.user.first_name} {db_author.user.last_name}")
     return db_author
 
-def get_all_authors(db: Session,skip:int=0,limit: int=10):
-    return db.query(Author).offset(skip).limit(limit).all()
+def get_all_authors(db: Session,skip:int=0,limit: int=10, cursor: Optional[str] = None, sort: str = "id"):
+    query = db.query(Author).options(*AUTHOR_LIST_OPTIONS)
+    return paginate(query, Author, sort, AUTHOR_SORT_KEYS, skip=skip, limit=limit, cursor=cursor)
 
 def get_author_by_id(db:Session,author_id:int):
-    return db.query(Author).filter(Author.id == author_id).first()
+    return db.query(Author).options(*AUTHOR_DETAIL_OPTIONS).filter(Author.id == author_id).first()
+
+def _book_snapshot(db: Session, book_id: int):
+    """
+    Plain-dict copy of a book (BookResponse fields), safe to share across sessions.
+    """
+    book = get_book_by_id(db, book_id)
+    if not book:
+        return None
+    return {column.name: getattr(book, column.name) for column in Book.__table__.columns}
+
+def _author_snapshot(db: Session, author_id: int):
+    author = get_author_by_id(db, author_id)
+    if not author:
+        return None
+    snapshot = {column.name: getattr(author, column.name) for column in Author.__table__.columns}
+    snapshot["books"] = [book.id for book in author.books]
+    return snapshot
 
 def update_author(db: Session, author_id:int, updates:AuthorUpdate):
     db_author = get_author_by_id(db, author_id)
@@ -98,14 +286,15 @@ def update_author(db: Session, author_id:int, updates:AuthorUpdate):
         return None
     for key, value in updates.dict(exclude_unset=True).items():
         setattr(db_author, key, value)
+    invalidate_on_commit(db, catalog_cache, ("author", author_id))
     db.commit()
-    db.refresh(db_author)
-    return db_author
+    return get_author_by_id(db, author_id)
 
 def delete_author(db: Session, author_id: int):
     db_author = get_author_by_id(db, author_id)
     if not db_author:
         return None
+    _forget_author(db, author_id)
     db.delete(db_author)
     db.commit()
     return f'{db_author} deleted successfully'
@@ -113,8 +302,8 @@ def delete_author(db: Session, author_id: int):
 def get_reservation(db: Session, reservation_id: int):
     return db.query(Reservation).filter(Reservation.id == reservation_id).first()
 
-def get_reservations(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(Reservation).offset(skip).limit(limit).all()
+def get_reservations(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, sort: str = "id"):
+    return paginate(db.query(Reservation), Reservation, sort, RESERVATION_SORT_KEYS, skip=skip, limit=limit, cursor=cursor)
 
 def create_reservation(db: Session, reservation: ReservationCreate):
     db_reservation = Reservation(
@@ -125,6 +314,10 @@ def create_reservation(db: Session, reservation: ReservationCreate):
         price=reservation.price
     )
     db.add(db_reservation)
+    # Keep the customer's reservation counter in step (no limit check on this raw endpoint)
+    db.query(Customer).filter(Customer.id == reservation.customer_id).update(
+        {Customer.active_reservations: Customer.active_reservations + 1}, synchronize_session=False
+    )
     db.commit()
     db.refresh(db_reservation)
     return db_reservation
@@ -143,6 +336,9 @@ def delete_reservation(db: Session, reservation_id: int):
     db_reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
     if db_reservation:
         db.delete(db_reservation)
+        db.query(Customer).filter(
+            Customer.id == db_reservation.customer_id, Customer.active_reservations > 0
+        ).update({Customer.active_reservations: Customer.active_reservations - 1}, synchronize_session=False)
         db.commit()
     return db_reservation
 
@@ -150,12 +346,16 @@ def delete_reservation(db: Session, reservation_id: int):
 def get_customer(db: Session, customer_id: int):
     return db.query(Customer).filter(Customer.id == customer_id).first()
 
-def get_customers(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(Customer).offset(skip).limit(limit).all()
+def get_customer_by_user_id(db: Session, user_id: int):
+    return db.query(Customer).filter(Customer.user_id == user_id).first()
+
+def get_customers(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, sort: str = "id"):
+    return paginate(db.query(Customer), Customer, sort, CUSTOMER_SORT_KEYS, skip=skip, limit=limit, cursor=cursor)
 
 def create_customer(db: Session, customer: CustomerCreate):
     db_customer = Customer(**customer.dict())
     db.add(db_customer)
+    invalidate_on_commit(db, principal_cache, principal_key(db_customer.user_id))
     db.commit()
     db.refresh(db_customer)
     return db_customer
@@ -166,6 +366,7 @@ def update_customer(db: Session,customer_id:int, updates:CustomerUpdate):
         return None
     for key, value in updates.dict(exclude_unset=True).items():
         setattr(db_customer, key, value)
+    invalidate_on_commit(db, principal_cache, principal_key(db_customer.user_id))
     db.commit()
     db.refresh(db_customer)
     return db_customer
@@ -173,6 +374,135 @@ def update_customer(db: Session,customer_id:int, updates:CustomerUpdate):
 def delete_customer(db: Session, customer_id: int):
     db_customer = db.query(Customer).filter(Customer.id == customer_id).first()
     if db_customer:
+        invalidate_on_commit(db, principal_cache, principal_key(db_customer.user_id))
         db.delete(db_customer)
         db.commit()
-    return db_customer
\ No newline at end of file
+    return db_customer
+
+
+# ----------------------------------------
+# Async variants (used by the routers, see app.database.run_db)
+# ----------------------------------------
+
+async def get_user_id_async(db, user_id: int):
+    return await run_db(db, get_user_id, user_id)
+
+async def get_principal_async(db, user_id: int):
+    return await _cached_lookup(db, principal_cache, principal_key(user_id), get_principal, user_id)
+
+async def get_user_by_username_async(db, username: str):
+    return await run_db(db, get_user_by_username, username)
+
+async def get_all_users_async(db, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, sort: str = "id"):
+    return await run_db(db, get_all_users, skip, limit, cursor, sort)
+
+async def create_user_async(db, user: UserCreate):
+    return await run_db(db, create_user, user)
+
+async def update_user_async(db, user_id: int, updates: dict):
+    return await run_db(db, update_user, user_id, updates)
+
+async def delete_user_async(db, user_id: int):
+    return await run_db(db, delete_user, user_id)
+
+async def create_book_async(db, book: BookCreate):
+    return await run_db(db, create_book, book)
+
+async def bulk_create_books_async(db, books: list[BookCreate], chunk_size: int = BOOK_BULK_CHUNK_SIZE):
+    return await run_db(db, bulk_create_books, books, chunk_size)
+
+async def bulk_upsert_books_async(db, books: list[BookCreate], chunk_size: int = BOOK_BULK_CHUNK_SIZE):
+    return await run_db(db, bulk_upsert_books, books, chunk_size)
+
+async def get_all_books_async(db, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, sort: str = "id"):
+    return await run_db(db, get_all_books, skip, limit, cursor, sort)
+
+async def _cached_lookup(db, cache, key, loader, *args):
+    """
+    Serves `key` from `cache`, loading it with `loader` on a miss.
+    Hits never touch the session, so they cost no connection checkout.
+    """
+    if not cache.enabled:
+        return await run_db(db, loader, *args)
+    value = cache.get(key)
+    if value is MISSING:
+        version = cache.version()
+        value = await run_db(db, loader, *args)
+        if value is not None:
+            cache.set(key, value, version)
+    return value
+
+def get_validators(db: Session, model, item_id: int):
+    """
+    (version, updated_at) of one row, without loading the rest of it.
+    """
+    return db.query(model.version, model.updated_at).filter(model.id == item_id).first()
+
+async def get_validators_async(db, kind: str, model, item_id: int):
+    """
+    Conditional GET support: takes the validators from the cached snapshot when there is one.
+    """
+    cached = catalog_cache.get((kind, item_id)) if catalog_cache.enabled else MISSING
+    if cached is not MISSING:
+        return cached["version"], cached["updated_at"]
+    return await run_db(db, get_validators, model, item_id)
+
+async def get_book_by_id_async(db, book_id: int):
+    return await _cached_lookup(db, catalog_cache, ("book", book_id), _book_snapshot, book_id)
+
+async def update_book_async(db, book_id: int, updates: BookUpdate):
+    return await run_db(db, update_book, book_id, updates)
+
+async def delete_book_async(db, book_id: int):
+    return await run_db(db, delete_book, book_id)
+
+async def create_author_async(db, author: AuthorCreate):
+    return await run_db(db, create_author, author)
+
+async def get_all_authors_async(db, skip:int=0, limit: int=10, cursor: Optional[str] = None, sort: str = "id"):
+    return await run_db(db, get_all_authors, skip, limit, cursor, sort)
+
+async def get_author_by_id_async(db, author_id:int):
+    return await _cached_lookup(db, catalog_cache, ("author", author_id), _author_snapshot, author_id)
+
+async def update_author_async(db, author_id:int, updates:AuthorUpdate):
+    return await run_db(db, update_author, author_id, updates)
+
+async def delete_author_async(db, author_id: int):
+    return await run_db(db, delete_author, author_id)
+
+async def get_reservation_async(db, reservation_id: int):
+    return await run_db(db, get_reservation, reservation_id)
+
+async def get_reservations_async(db, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, sort: str = "id"):
+    return await run_db(db, get_reservations, skip, limit, cursor, sort)
+
+async def create_reservation_async(db, reservation: ReservationCreate):
+    return await run_db(db, create_reservation, reservation)
+
+async def update_reservation_async(db, reservation_id: int, reservation: ReservationUpdate):
+    return await run_db(db, update_reservation, reservation_id, reservation)
+
+async def delete_reservation_async(db, reservation_id: int):
+    return await run_db(db, delete_reservation, reservation_id)
+
+async def get_customer_async(db, customer_id: int):
+    return await run_db(db, get_customer, customer_id)
+
+async def get_customer_by_user_id_async(db, user_id: int):
+    return await run_db(db, get_customer_by_user_id, user_id)
+
+async def get_customers_async(db, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, sort: str = "id"):
+    return await run_db(db, get_customers, skip, limit, cursor, sort)
+
+async def estimate_count_async(db, model):
+    return await run_db(db, estimate_count, model)
+
+async def create_customer_async(db, customer: CustomerCreate):
+    return await run_db(db, create_customer, customer)
+
+async def update_customer_async(db, customer_id:int, updates:CustomerUpdate):
+    return await run_db(db, update_customer, customer_id, updates)
+
+async def delete_customer_async(db, customer_id: int):
+    return await run_db(db, delete_customer, customer_id)
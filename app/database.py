@@ -1,29 +1,357 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool, instrument_engine
+from contextvars import ContextVar
+import logging
+import math
 import os
+import time
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 
 load_dotenv()
 
-DATABASE_URL = (
+DATABASE_URL = os.getenv("DATABASE_URL") or (
     f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
     f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
 )
 
-engine = create_engine(DATABASE_URL)
-try:
-    with engine.connect() as connection:
-        print("Database connection successful!")
-except Exception as e:
-    print(f"Database connection failed: {e}")
-SessionLocal = sessionmaker(bind=engine)
+
+
+def _async_url(url: str):
+    """
+    Async driver URL (asyncpg for Postgres, aiosqlite for local SQLite runs).
+    """
+    return (
+        url
+        .replace("postgresql://", "postgresql+asyncpg://", 1)
+        .replace("sqlite://", "sqlite+aiosqlite://", 1)
+    )
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+# Optional read replica for read-only endpoints (see get_read_db)
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+ASYNC_REPLICA_DATABASE_URL = os.getenv("ASYNC_REPLICA_DATABASE_URL") or (
+    _async_url(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else None
+)
+# Reads fall back to the primary when the replica is further behind than this,
+# and for this long after the same client's last write (see ReadYourWritesMiddleware)
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", 5))
+DB_REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", 2))
+
+# Selects which session type get_db hands to the routers: "sync" or "async"
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+if DB_MODE not in ("sync", "async"):
+    raise ValueError(f"DB_MODE must be 'sync' or 'async', got {DB_MODE!r}")
+
+# Connection pool settings (per deployment, see SQLAlchemy QueuePool docs)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", -1))  # seconds, -1 disables
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+DB_POOL_USE_LIFO = os.getenv("DB_POOL_USE_LIFO", "false").lower() == "true"
+
+
+def _pool_options(url: str, poolclass):
+    """
+    Engine keyword arguments for the configured pool.
+    In-memory SQLite keeps SQLAlchemy's default single-connection pool.
+    """
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_use_lifo": DB_POOL_USE_LIFO,
+    }
+
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+
+# ----------------------------------------
+# Engines (created lazily on first use, never at import time)
+# ----------------------------------------
+
+_engines = {}
+_replica_state = {"lag": 0.0, "lag_checked_at": 0.0}
+
+# Per-request dict set by ReadYourWritesMiddleware; background threads have none
+_request_writes = ContextVar("request_writes", default=None)
+
+
+def _on_primary_execute(connection, cursor, statement, parameters, context, executemany):
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        connection.info["wrote"] = True
+
+
+def _on_primary_commit(connection):
+    # Only commits that wrote something pin the client's reads to the primary
+    if connection.info.pop("wrote", False):
+        writes = _request_writes.get()
+        if writes is not None:
+            writes["wrote_at"] = time.time()
+
+
+def _on_primary_rollback(connection):
+    connection.info.pop("wrote", None)
+
+
+def _build_engine(name: str, url: str, is_async: bool):
+    if name not in _engines:
+        if is_async:
+            new_engine = create_async_engine(url, **_pool_options(url, InstrumentedAsyncQueuePool))
+            sync_engine = new_engine.sync_engine
+        else:
+            new_engine = create_engine(url, **_pool_options(url, InstrumentedQueuePool))
+            sync_engine = new_engine
+        instrument_engine(sync_engine)
+        if not name.endswith("replica"):
+            event.listen(sync_engine, "after_cursor_execute", _on_primary_execute)
+            event.listen(sync_engine, "commit", _on_primary_commit)
+            event.listen(sync_engine, "rollback", _on_primary_rollback)
+        _engines[name] = new_engine
+    return _engines[name]
+
+
+def get_engine():
+    return _build_engine("primary", DATABASE_URL, is_async=False)
+
+
+def get_async_engine():
+    return _build_engine("async", ASYNC_DATABASE_URL, is_async=True)
+
+
+def get_replica_engine():
+    if not REPLICA_DATABASE_URL:
+        return None
+    return _build_engine("replica", REPLICA_DATABASE_URL, is_async=False)
+
+
+def get_async_replica_engine():
+    if not ASYNC_REPLICA_DATABASE_URL:
+        return None
+    return _build_engine("async_replica", ASYNC_REPLICA_DATABASE_URL, is_async=True)
+
+
+def created_engines():
+    """
+    Engines that have been created so far, by name (sync engines for async ones).
+    """
+    return {
+        name: getattr(created, "sync_engine", created)
+        for name, created in _engines.items()
+    }
+
+
+async def dispose_engines():
+    for created in list(_engines.values()):
+        if isinstance(created, AsyncEngine):
+            await created.dispose()
+        else:
+            created.dispose()
+    _engines.clear()
+
+
+class DeferrableCommitSession(Session):
+    """
+    While info["defer_commit"] is set, commit() only flushes: the caller that set it
+    commits the services' writes together with its own (see app.core.idempotency).
+    """
+
+    def commit(self):
+        if self.info.get("defer_commit"):
+            self.flush()
+            return
+        super().commit()
+
+
+# Sessions resolve their engine on first query, so building them never opens a connection
+class PrimarySession(DeferrableCommitSession):
+    def get_bind(self, mapper=None, **kw):
+        return get_engine()
+
+
+class ReplicaSession(Session):
+    def get_bind(self, mapper=None, **kw):
+        return get_replica_engine()
+
+
+class AsyncPrimarySession(DeferrableCommitSession):
+    def get_bind(self, mapper=None, **kw):
+        return get_async_engine().sync_engine
+
+
+class AsyncReplicaSession(Session):
+    def get_bind(self, mapper=None, **kw):
+        return get_async_replica_engine().sync_engine
+
+
+SessionLocal = sessionmaker(class_=PrimarySession)
+ReplicaSessionLocal = sessionmaker(class_=ReplicaSession)
+# expire_on_commit=False so returned objects can be serialized without lazy IO
+AsyncSessionLocal = async_sessionmaker(sync_session_class=AsyncPrimarySession, expire_on_commit=False)
+AsyncReplicaSessionLocal = async_sessionmaker(sync_session_class=AsyncReplicaSession, expire_on_commit=False)
+
+
+# ----------------------------------------
+# Replica routing
+# ----------------------------------------
+
+def replica_lag_seconds(connection):
+    """
+    Replication delay of the replica behind the primary, in seconds.
+    Only Postgres streaming replicas report lag; other backends count as caught up.
+    """
+    if connection.dialect.name != "postgresql":
+        return 0.0
+    lag = connection.execute(text(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    )).scalar()
+    return float(lag or 0.0)
+
+
+# Read-your-writes: a request whose primary transaction wrote something hands the
+# client the commit time, in a cookie and a response header of the same name.
+# Clients that keep cookies (or echo the header) read from the primary until then
+# plus DB_REPLICA_MAX_LAG_SECONDS; everyone else keeps using the replica.
+LAST_WRITE_COOKIE = "x-last-write"
+
+
+class ReadYourWritesMiddleware:
+    """
+    Records whether the request committed a write on the primary and, if so,
+    sets the LAST_WRITE_COOKIE cookie and header on the response.
+    Writes committed after the response started (streaming bodies) are not reported.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writes = {}
+        token = _request_writes.set(writes)
+
+        async def send_with_write_time(message):
+            if message["type"] == "http.response.start" and "wrote_at" in writes:
+                value = f"{writes['wrote_at']:.3f}"
+                headers = MutableHeaders(scope=message)
+                headers.append(LAST_WRITE_COOKIE, value)
+                headers.append("set-cookie", f"{LAST_WRITE_COOKIE}={value}; Max-Age="
+                               f"{math.ceil(DB_REPLICA_MAX_LAG_SECONDS)}; Path=/; HttpOnly; SameSite=Lax")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_write_time)
+        finally:
+            _request_writes.reset(token)
+
+
+def _client_wrote_recently(request: Request):
+    value = request.headers.get(LAST_WRITE_COOKIE) or request.cookies.get(LAST_WRITE_COOKIE)
     try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+        age = time.time() - float(value)
+    except (TypeError, ValueError):
+        return False
+    return 0 <= age < DB_REPLICA_MAX_LAG_SECONDS  # future times are ignored
+
+
+async def _replica_is_usable(request: Request):
+    """
+    Decides whether a read can go to the replica without showing stale data.
+    """
+    if not REPLICA_DATABASE_URL:
+        return False
+
+    # Read-your-writes: stay on the primary while this client's write may not have replicated yet
+    if _client_wrote_recently(request):
+        return False
+
+    now = time.monotonic()
+    if now - _replica_state["lag_checked_at"] >= DB_REPLICA_LAG_CHECK_INTERVAL:
+        _replica_state["lag_checked_at"] = now
+        try:
+            if DB_MODE == "async":
+                async with get_async_replica_engine().connect() as connection:
+                    _replica_state["lag"] = await connection.run_sync(replica_lag_seconds)
+            else:
+                def check():
+                    with get_replica_engine().connect() as connection:
+                        return replica_lag_seconds(connection)
+                _replica_state["lag"] = await run_in_threadpool(check)
+        except Exception as e:
+            logger.warning("Replica lag check failed, reading from primary: %s", e)
+            _replica_state["lag"] = float("inf")
+
+    return _replica_state["lag"] <= DB_REPLICA_MAX_LAG_SECONDS
+
+
+async def get_db():
+    """
+    Yields a database session for the configured DB_MODE.
+    - sync: a regular Session, queries run in the threadpool via run_db.
+    - async: an AsyncSession, queries run on the event loop via run_db.
+    """
+    if DB_MODE == "async":
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def get_read_db(request: Request):
+    """
+    Yields a session for read-only endpoints.
+    Routes to the replica when one is configured and within DB_REPLICA_MAX_LAG_SECONDS,
+    unless the client wrote within that window, otherwise behaves exactly like get_db.
+    Endpoints that must see their own writes use get_db.
+    """
+    if not await _replica_is_usable(request):
+        async for db in get_db():
+            yield db
+        return
+
+    if DB_MODE == "async":
+        async with AsyncReplicaSessionLocal() as db:
+            yield db
+    else:
+        db = ReplicaSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Runs a sync ORM function `fn(session, *args, **kwargs)` against either session type.
+    AsyncSession executes it through run_sync (non-blocking driver IO),
+    a plain Session executes it in the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
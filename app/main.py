@@ -1,29 +1,76 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.database import Base,engine
+from fastapi.responses import ORJSONResponse
+from app.database import DATABASE_URL, REPLICA_DATABASE_URL, ReadYourWritesMiddleware, dispose_engines, get_engine
+from app.core.cache import InvalidationListener, catalog_cache
+from app.core.principal import principal_cache
+from app.core.hashing import password_hasher
+from app.core.auth import otp_store
+from app.core.revocation import token_denylist
+from app.core.expiry import reservation_expiry
+from app.core.compression import CompressionMiddleware
+from app.core.config import (
+    CATALOG_CACHE_NOTIFY, COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_BROTLI,
+)
 from app import models
-from app.routes import users,books,authors,reservations,customers,auth,membership,wallet,admins
+from app.routes import users,books,authors,reservations,customers,auth,membership,wallet,admins,health
 
-app = FastAPI()
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup stays free of database work: engines connect on first use and
+    the schema is managed by Alembic only (`alembic upgrade head`).
+    The optional cache invalidation listener, the OTP sweeper, the token
+    denylist refresher and the reservation expiry worker run in their own threads.
+    """
+    otp_store.start()
+    token_denylist.start()
+    reservation_expiry.start()
+    listener = None
+    caches = [cache for cache in (catalog_cache, principal_cache) if cache.enabled]
+    if CATALOG_CACHE_NOTIFY and caches and DATABASE_URL.startswith("postgresql"):
+        listener = InvalidationListener(caches, get_engine)
+        listener.start()
+    yield
+    if listener is not None:
+        listener.stop()
+    reservation_expiry.stop()
+    otp_store.stop()
+    token_denylist.stop()
+    password_hasher.shutdown()
+    await dispose_engines()
 
-@app.get("/")
-def read_root():
-    return {"message": "FastAPI is running with PostgreSQL"}
 
-app.include_router(users.router, prefix="/users", tags=["Users"])
-app.include_router(books.router, prefix="/books", tags=["Books"])
-app.include_router(authors.router, prefix="/authors", tags=["Authors"])
-app.include_router(reservations.router, prefix="/reservations", tags=["Reservations"])
-app.include_router(customers.router, prefix="/customers", tags=["Customers"])
-app.include_router(auth.router, prefix="/auth", tags=["Auth"])
-app.include_router(membership.router, prefix="/membership", tags=["Membership"])
-app.include_router(wallet.router, prefix="/wallet", tags=["Wallet"])
-app.include_router(admins.router, prefix="/admin", tags=["Admin"])
+def create_app() -> FastAPI:
+    # orjson renders every response_model body; large lists use app.core.serialization
+    app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_level=COMPRESSION_GZIP_LEVEL,
+        brotli_quality=COMPRESSION_BROTLI_QUALITY,
+        enable_brotli=COMPRESSION_BROTLI,
+    )
+    if REPLICA_DATABASE_URL:
+        app.add_middleware(ReadYourWritesMiddleware)
 
+    @app.get("/")
+    def read_root():
+        return {"message": "FastAPI is running with PostgreSQL"}
 
-try:
-    with engine.connect() as connection:
-        print("Database connection successful!")
-except Exception as e:
-    print(f"Database connection failed: {e}")
\ No newline at end of file
+    app.include_router(health.router, tags=["Health"])
+    app.include_router(users.router, prefix="/users", tags=["Users"])
+    app.include_router(books.router, prefix="/books", tags=["Books"])
+    app.include_router(authors.router, prefix="/authors", tags=["Authors"])
+    app.include_router(reservations.router, prefix="/reservations", tags=["Reservations"])
+    app.include_router(customers.router, prefix="/customers", tags=["Customers"])
+    app.include_router(auth.router, prefix="/auth", tags=["Auth"])
+    app.include_router(membership.router, prefix="/membership", tags=["Membership"])
+    app.include_router(wallet.router, prefix="/wallet", tags=["Wallet"])
+    app.include_router(admins.router, prefix="/admin", tags=["Admin"])
+    return app
+
+
+app = create_app()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float,ForeignKey,Table,DateTime,BigInteger
+from sqlalchemy import Column, Integer, String, Float,ForeignKey,Table,Date,DateTime,BigInteger,Index,text,Text
 from app.database import Base
 from sqlalchemy.orm import relationship
 from enum import Enum
@@ -20,6 +20,8 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
     user_role = Column(String, default=UserRole.CUSTOMER.value,nullable=False)
+    # Embedded in every access token as "ver"; bumping it revokes all of the user's tokens
+    token_version = Column(Integer, nullable=False, default=1, server_default="1")
 
     author_profile = relationship("Author", back_populates="user")
     customer_profile = relationship("Customer", back_populates="user", uselist=False)
@@ -45,6 +47,9 @@ author_book = Table(
 
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        Index("ix_books_title_id", "title", "id"),  # keyset pagination sorted by title
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -53,6 +58,9 @@ class Book(Base):
     author_id = Column(Integer, ForeignKey("authors.id",ondelete="CASCADE"), nullable=False)
     description = Column(String)
     units = Column(Integer, nullable=False)
+    # Validators for ETag/Last-Modified, bumped by every UPDATE (see crud for Core upserts)
+    version = Column(Integer, nullable=False, default=1, onupdate=text("version + 1"))
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     authors = relationship("Author", secondary="author_book", back_populates="books")
 
@@ -63,13 +71,21 @@ class Author(Base):
     city_id = Column(Integer, ForeignKey('cities.id',ondelete="SET NULL"), nullable=False)
     goodreads_link = Column(String, nullable=True)
     bank_account_number = Column(String, nullable=True)
+    version = Column(Integer, nullable=False, default=1, onupdate=text("version + 1"))
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = relationship("User", back_populates="author_profile")
     city = relationship("City")
+    # Loaded per query (see crud.AUTHOR_*_OPTIONS): async sessions cannot lazy load while serializing
     books = relationship("Book", secondary="author_book", back_populates="authors") # many to many relationship
 
 class Reservation(Base):
     __tablename__ = "reservations"
+    __table_args__ = (
+        Index("ix_reservations_customer_id", "customer_id"),
+        Index("ix_reservations_book_id_customer_id", "book_id", "customer_id"),
+        Index("ix_reservations_end_date", "end_date"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
@@ -93,17 +109,76 @@ class Customer(Base):
     subscription_model = Column(String, nullable=False, default=SubscriptionModel.FREE.value)
     subscription_end_time = Column(Date, nullable=True)
     wallet_money_amount = Column(Integer, nullable=False, default=0.0)
+    # Rows in reservations for this customer, maintained by the reservation services
+    # and checked against the membership limit; see reconcile_active_reservations
+    active_reservations = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="customer_profile")
 
 
 class ReservationQueue(Base):
     __tablename__ = "reservation_queue"
+    __table_args__ = (
+        # waitlist promotion: a book's queue by priority, then arrival
+        Index("ix_reservation_queue_book_id_priority", "book_id", text("priority DESC"), "created_at"),
+        Index("ix_reservation_queue_customer_id_book_id", "customer_id", "book_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=False)
     book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Higher is served first, see app.services.reservations.QUEUE_PRIORITY
+    priority = Column(Integer, nullable=False, default=0, server_default="0")
 
     customer = relationship("Customer")
-    book = relationship("Book")
\ No newline at end of file
+    book = relationship("Book")
+
+
+class OneTimePassword(Base):
+    """
+    Pending login OTPs for the shared OTP store (OTP_BACKEND=database), one per username.
+    Only an HMAC of the code is stored.
+    """
+    __tablename__ = "otp_codes"
+
+    username = Column(String, primary_key=True)
+    code_hash = Column(String(64), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+
+
+class RevokedToken(Base):
+    """
+    Individually revoked access tokens (jti denylist), kept until the token would have expired.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class RateLimitState(Base):
+    """
+    Token bucket per rate limit key for the shared rate limiter (RATE_LIMIT_BACKEND=database).
+    `tat` is the epoch time at which the bucket is full again.
+    """
+    __tablename__ = "rate_limits"
+
+    key = Column(String, primary_key=True)
+    tat = Column(Float, nullable=False, index=True)
+
+
+class IdempotencyKey(Base):
+    """
+    Outcome of a POST sent with an Idempotency-Key header, replayed to retries until
+    `expires_at`. `status_code` is NULL while the first request is still running.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)  # "<user id>:<Idempotency-Key header>"
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
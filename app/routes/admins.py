@@ -1,135 +1,168 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, Reservation,Book , ReservationQueue
-from app.core.auth import get_current_user, revoked_tokens
+import json
+import os
+import re
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from app.database import get_db, created_engines, SessionLocal
+from app.core.config import BOOK_BULK_CHUNK_SIZE, CATALOG_IMPORT_DIR
+from app.crud import MAX_BULK_CHUNK_SIZE
+from app.core.pool_metrics import pool_status
+from app.core.cache import catalog_cache
+from app.core.principal import principal_cache
+from app.core.hashing import password_hasher
+from app.core.expiry import reservation_expiry
+from app.models import User
+from app.core.auth import get_current_user
 from app.core.auth import check_user_role
-from datetime import datetime
+from app.services.admin import (
+    revoke_user_token_async,
+    end_reservation_early_async,
+    get_book_reservations_async,
+    remove_user_from_reservation_or_queue_async,
+)
 
 router = APIRouter()
 
 @router.delete("/revoke-token/{user_id}")
-def revoke_user_token(
+async def revoke_user_token(
     user_id: int,
-    db: Session = Depends(get_db),
+    db=Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Admins can revoke a user's access token except for other admins.
     """
     check_user_role(current_user, allowed_roles=["admin"])  # Ensure only admins can revoke tokens
-
-    # Fetch the user to be revoked
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Ensure admins cannot revoke other admins' tokens
-    if user.user_role.lower() == "admin":
-        raise HTTPException(status_code=403, detail="Cannot revoke another admin’s token.")
-
-    # Convert user_id to an integer before adding to revoked_tokens
-    revoked_tokens.add(int(user_id))
-
-    return {"message": f"Token for user {user.username} has been revoked."}
+    return await revoke_user_token_async(db, user_id)
 
 # Admins can end reservation's anytime they want
 @router.put("/reservations/{reservation_id}/end")
-def end_reservation_early(
+async def end_reservation_early(
     reservation_id: int,
-    db: Session = Depends(get_db),
+    db=Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Admins can forcefully end a user's reservation before its scheduled end time.
     """
     check_user_role(current_user, allowed_roles=["admin"])
-
-    # Fetch reservation
-    reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
-    if not reservation:
-        raise HTTPException(status_code=404, detail="Reservation not found")
-
-    # Update reservation to end immediately
-    reservation.end_date = datetime.utcnow()
-    db.commit()
-    return {"message": f"Reservation {reservation_id} has been ended early."}
+    return await end_reservation_early_async(db, reservation_id)
 
 # Admin can view book reservations queue
 
 @router.get('/books/{book_id}/reservations')
-def get_book_reservations(
+async def get_book_reservations(
         book_id: int,
-        db: Session = Depends(get_db),
+        db=Depends(get_db),
         current_user: User = Depends(get_current_user),
 ):
     """
         Admins can view a book's current holders and scheduled reservers in queue.
         """
     check_user_role(current_user, allowed_roles=["admin"])
-
-    # Get the book
-    book = db.query(Book).filter(Book.id == book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-
-    # Get active reservations
-    active_reservations = (
-        db.query(Reservation)
-        .filter(Reservation.book_id == book_id)
-        .all()
-    )
-
-    # Get users in queue
-    queue_users = (
-        db.query(ReservationQueue)
-        .filter(ReservationQueue.book_id == book_id)
-        .all()
-    )
-
-    return {
-        "active_reservations": [
-            {"user_id": res.customer_id, "start_date": res.start_date, "end_date": res.end_date}
-            for res in active_reservations
-        ],
-        "queue_users": [
-            {"user_id": queue.customer_id, "queued_at": queue.created_at}
-            for queue in queue_users
-        ],
-    }
+    return await get_book_reservations_async(db, book_id)
 
 @router.delete("/books/{book_id}/remove-user/{user_id}")
-def remove_user_from_reservation_or_queue(
+async def remove_user_from_reservation_or_queue(
     book_id: int,
     user_id: int,
-    db: Session = Depends(get_db),
+    db=Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Admins can remove a user from a reservation or waiting queue.
     """
     check_user_role(current_user, allowed_roles=["admin"])
+    return await remove_user_from_reservation_or_queue_async(db, book_id, user_id)
+
+@router.get("/db/pool")
+async def get_db_pool_metrics(current_user: User = Depends(get_current_user)):
+    """
+    Admins can inspect connection pool occupancy and wait/hold time histograms.
+    """
+    check_user_role(current_user, allowed_roles=["admin"])
+    # Engines are created lazily, so only pools that have served traffic are listed
+    return {name: pool_status(created) for name, created in created_engines().items()}
+
+@router.get("/cache")
+async def get_cache_metrics(current_user: User = Depends(get_current_user)):
+    """
+    Admins can inspect the catalog and principal cache hit/miss/eviction counters.
+    """
+    check_user_role(current_user, allowed_roles=["admin"])
+    return {"catalog": catalog_cache.stats(), "principal": principal_cache.stats()}
 
-    # Check if user has an active reservation
-    reservation = (
-        db.query(Reservation)
-        .filter(Reservation.book_id == book_id,Reservation.customer_id == user_id)
-        .first()
-    )
-    if reservation:
-        db.delete(reservation)
-        db.commit()
-        return {"message": f"User:{user_id} removed from active reservation for book:{book_id}"}
-
-    # Check if user is in queue
-    queue_entry = (
-        db.query(ReservationQueue)
-        .filter(ReservationQueue.book_id == book_id, ReservationQueue.customer_id == user_id)
-        .first()
-    )
-    if queue_entry:
-        db.delete(queue_entry)
-        db.commit()
-        return {"message": f"User {user_id} removed from reservation queue for book {book_id}"}
-
-    raise HTTPException(status_code=404, detail="User not found in reservations or queue")
+@router.delete("/cache")
+async def clear_cache(current_user: User = Depends(get_current_user)):
+    """
+    Admins can drop every cached book, author and principal of this worker.
+    """
+    check_user_role(current_user, allowed_roles=["admin"])
+    catalog_cache.clear()
+    principal_cache.clear()
+    return {"message": "Catalog and principal caches cleared."}
+
+@router.get("/password-hashing")
+async def get_password_hashing_metrics(current_user: User = Depends(get_current_user)):
+    """
+    Admins can inspect the bcrypt executor's queue depth and 503 rejections.
+    """
+    check_user_role(current_user, allowed_roles=["admin"])
+    return password_hasher.stats()
+
+@router.get("/reservation-expiry")
+async def get_reservation_expiry_metrics(current_user: User = Depends(get_current_user)):
+    """
+    Admins can inspect this worker's reservation expiry runs and the current expiry lag.
+    """
+    check_user_role(current_user, allowed_roles=["admin"])
+    return reservation_expiry.stats()
+
+@router.post("/books/import")
+async def import_books_catalog(
+    request: Request,
+    format: str = "csv",
+    import_id: str = None,
+    batch_size: int = Query(BOOK_BULK_CHUNK_SIZE, ge=1, le=MAX_BULK_CHUNK_SIZE),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Admins can stream a CSV/JSONL catalog dump as the raw request body.
+    Progress is streamed back as NDJSON, one summary line per committed batch.
+    Re-sending the same file with the same import_id resumes from its checkpoint.
+    """
+    check_user_role(current_user, allowed_roles=["admin"])
+    from app.services.catalog_import import import_books, open_text
+
+    if format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="format must be csv or jsonl")
+    if import_id and not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", import_id):
+        raise HTTPException(status_code=400, detail="import_id may only contain letters, digits, _ and -")
+
+    # Spool the body to disk chunk by chunk so memory stays flat for any upload size
+    os.makedirs(CATALOG_IMPORT_DIR, exist_ok=True)
+    upload = tempfile.NamedTemporaryFile(dir=CATALOG_IMPORT_DIR, suffix=f".{format}", delete=False)
+    try:
+        with upload:
+            async for chunk in request.stream():
+                await run_in_threadpool(upload.write, chunk)
+    except BaseException:  # includes the client disconnecting mid-upload
+        os.remove(upload.name)
+        raise
+    checkpoint = os.path.join(CATALOG_IMPORT_DIR, f"catalog-import-{import_id}.json") if import_id else None
+
+    def progress():
+        db = SessionLocal()
+        try:
+            with open_text(upload.name) as stream:
+                for summary in import_books(db, stream, format, batch_size, checkpoint):
+                    yield json.dumps(summary) + "\n"
+        finally:
+            db.close()
+
+    # Removed once the response ends, even if the client left before streaming started
+    return StreamingResponse(progress(), media_type="application/x-ndjson",
+                             background=BackgroundTask(os.remove, upload.name))
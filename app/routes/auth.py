@@ -1,105 +1,95 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas import SignUp, Login, Token,OTPResponse,VerifyOTPRequest
-from app.models import User,Customer
-from app.core.auth import verify_password, get_password_hash, create_access_token,save_otp,generate_otp,clear_otp,get_saved_otp
+from app.crud import get_user_by_username_async, update_user_async
+from app.core.auth import verify_password_async, get_password_hash_async, create_access_token,save_otp,generate_otp,consume_otp, \
+    oauth2_scheme, get_current_principal, revoke_token
+from app.core.config import TOKEN_DENYLIST
+from app.core.rate_limit import (
+    limit_by_ip, limit_by_username, LOGIN_LIMIT, REQUEST_OTP_LIMIT, VERIFY_OTP_LIMIT, LOGIN_USERNAME_LIMIT,
+    REQUEST_OTP_USERNAME_LIMIT, VERIFY_OTP_USERNAME_LIMIT,
+)
+from app.services.auth import register_user_async
 
 router = APIRouter()
 
 
 @router.post("/signup", response_model=Token)
-def signup(user: SignUp, db: Session = Depends(get_db)):
-    # Check if username or email already exists
-    existing_user = db.query(User).filter(
-        (User.username == user.username) | (User.email == user.email)
-    ).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username or email already exists",
-        )
-
-    # Hash the password
-    hashed_password = get_password_hash(user.password)
-
-    # Create the new user
-    new_user = User(
-        username=user.username,
-        email=user.email,
-        password=hashed_password,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        phone=user.phone,
-        user_role=user.user_role,
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-
-    if new_user.user_role.lower() == "customer":
-        new_customer = Customer(
-            user_id=new_user.id,
-            subscription_model="free",  # Default new customers to "free"
-            subscription_end_time=None,
-            wallet_money_amount=0.0,  # New customers start with 0 money
-        )
-        db.add(new_customer)
-        db.commit()
-        db.refresh(new_customer)
+async def signup(user: SignUp, db=Depends(get_db)):
+    # Hash the password (bcrypt is CPU bound, it runs on the dedicated hashing executor)
+    hashed_password = await get_password_hash_async(user.password)
+    new_user = await register_user_async(db, user, hashed_password)
 
     # Generate an access token for the user
-    access_token = create_access_token(data={"sub": new_user.username})
+    access_token = create_access_token(new_user)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-@router.post("/login", response_model=OTPResponse)
-def login(user: Login, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user.username).first()
+@router.post("/login", response_model=OTPResponse, dependencies=[
+    Depends(limit_by_ip(LOGIN_LIMIT)), Depends(limit_by_username(LOGIN_USERNAME_LIMIT)),
+])
+async def login(user: Login, db=Depends(get_db)):
+    db_user = await get_user_by_username_async(db, user.username)
     if not db_user:
         print("User not found.")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid username or password")
 
-    if not verify_password(user.password, db_user.password):
+    matches, new_hash = await verify_password_async(user.password, db_user.password)
+    if not matches:
         print("Password mismatch.")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid username or password")
 
+    # The stored hash uses an outdated bcrypt cost: replace it while we have the password
+    if new_hash:
+        await update_user_async(db, db_user.id, {"password": new_hash})
+
     otp = generate_otp()
     print(f"Generated OTP: {otp}")
-    save_otp(user.username, otp)
+    await save_otp(user.username, otp)
     print(f"OTP saved for user: {user.username}")
     return {"message": "OTP sent. Please verify to complete login."}
 
-    print(f"Error during login: {e}")
-    raise HTTPException(status_code=500, detail="Internal Server Error")
-
 
 # OTP implementation
-@router.post("/request-otp")
-def request_otp(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
+@router.post("/request-otp", dependencies=[
+    Depends(limit_by_ip(REQUEST_OTP_LIMIT)), Depends(limit_by_username(REQUEST_OTP_USERNAME_LIMIT)),
+])
+async def request_otp(username: str, db=Depends(get_db)):
+    user = await get_user_by_username_async(db, username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     otp = generate_otp()
-    save_otp(username, otp)
+    await save_otp(username, otp)
 
     # Simulate sending OTP
     print(f"OTP for {username}: {otp}")
     return {"message": "OTP sent to your registered phone/email"}
 
 
-@router.post("/verify-otp", response_model=Token)
-def verify_otp(request: VerifyOTPRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == request.username).first()
+@router.post("/verify-otp", response_model=Token, dependencies=[
+    Depends(limit_by_ip(VERIFY_OTP_LIMIT)), Depends(limit_by_username(VERIFY_OTP_USERNAME_LIMIT)),
+])
+async def verify_otp(request: VerifyOTPRequest, db=Depends(get_db)):
+    user = await get_user_by_username_async(db, request.username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Retrieve and verify OTP
-    saved_otp = get_saved_otp(request.username)
-    if not saved_otp or saved_otp != request.otp:
+    # Verify and consume the OTP in one step
+    if not await consume_otp(request.username, request.otp):
         raise HTTPException(status_code=400, detail="Invalid or expired OTP")
 
-    clear_otp(request.username)
     access_token = create_access_token(user)
     return {"access_token": access_token, "token_type": "bearer"}
 
+
+async def logout(token: str = Depends(oauth2_scheme), principal=Depends(get_current_principal)):
+    """
+    Revokes the presented access token; the user's other tokens stay valid.
+    """
+    await revoke_token(token)
+    return {"message": "Logged out."}
+
+
+# Single-token revocation needs the jti denylist
+if TOKEN_DENYLIST:
+    router.add_api_route("/logout", logout, methods=["POST"])
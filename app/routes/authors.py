@@ -1,37 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from typing import Optional
+from app.core.pagination import set_pagination_headers
+from app.core.serialization import json_list_response
+from app.core.conditional import (
+    resource_etag, list_etag, last_modified_of, is_conditional, is_not_modified, set_validators,
+    not_modified_response,
+)
+from app.database import get_db, get_read_db
+from app.models import Author
 from app.schemas import AuthorCreate, AuthorUpdate, AuthorResponse
-from app.crud import create_author, get_all_authors, get_author_by_id, update_author, delete_author
+from app.crud import (
+    create_author_async,
+    get_all_authors_async,
+    estimate_count_async,
+    get_author_by_id_async,
+    get_validators_async,
+    update_author_async,
+    delete_author_async,
+)
 
 router = APIRouter()
 
 @router.get("/", response_model=list[AuthorResponse])
-def get_authors_endpoint(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return get_all_authors(db, skip=skip, limit=limit)
+async def get_authors_endpoint(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    with_total: bool = False,
+    db=Depends(get_read_db),
+):
+    authors = await get_all_authors_async(db, skip=skip, limit=limit, cursor=cursor, sort=sort)
+    etag = list_etag("authors", authors, skip, limit, cursor, sort)
+    last_modified = last_modified_of(authors)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    total = await estimate_count_async(db, Author) if with_total else None
+    set_pagination_headers(response, authors, sort, limit, total)
+    set_validators(response, etag, last_modified)
+    return json_list_response(AuthorResponse, authors, response)
 
 @router.get("/{author_id}", response_model=AuthorResponse)
-def get_author_endpoint(author_id: int, db: Session = Depends(get_db)):
-    author = get_author_by_id(db, author_id)
+async def get_author_endpoint(author_id: int, request: Request, response: Response, db=Depends(get_read_db)):
+    if is_conditional(request):
+        validators = await get_validators_async(db, "author", Author, author_id)
+        if validators:
+            etag = resource_etag("author", author_id, validators[0])
+            if is_not_modified(request, etag, validators[1]):
+                return not_modified_response(etag, validators[1])
+    author = await get_author_by_id_async(db, author_id)
     if not author:
         raise HTTPException(status_code=404, detail="Author not found")
+    set_validators(response, resource_etag("author", author_id, author["version"]), author["updated_at"])
     return author
 
 @router.post("/", response_model=AuthorResponse)
-def create_author_endpoint(author: AuthorCreate, db: Session = Depends(get_db)):
-    return create_author(db, author)
+async def create_author_endpoint(author: AuthorCreate, db=Depends(get_db)):
+    return await create_author_async(db, author)
 
 
 @router.put("/{author_id}", response_model=AuthorResponse)
-def update_author_endpoint(author_id: int, updates: AuthorUpdate, db: Session = Depends(get_db)):
-    author = update_author(db, author_id, updates)
+async def update_author_endpoint(author_id: int, updates: AuthorUpdate, db=Depends(get_db)):
+    author = await update_author_async(db, author_id, updates)
     if not author:
         raise HTTPException(status_code=404, detail="Author not found")
     return author
 
 @router.delete("/{author_id}", response_model=AuthorResponse)
-def delete_author_endpoint(author_id: int, db: Session = Depends(get_db)):
-    author = delete_author(db, author_id)
+async def delete_author_endpoint(author_id: int, db=Depends(get_db)):
+    author = await delete_author_async(db, author_id)
     if not author:
         raise HTTPException(status_code=404, detail="Author not found")
     return author
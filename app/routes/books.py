@@ -1,36 +1,158 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.schemas import BookCreate, BookUpdate, BookResponse
-from app.crud import create_book, get_all_books, get_book_by_id, update_book, delete_book
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.core.pagination import set_pagination_headers
+from app.core.serialization import json_list_response
+from app.core.conditional import (
+    resource_etag, list_etag, last_modified_of, is_conditional, is_not_modified, set_validators,
+    not_modified_response,
+)
+from app.database import get_db, get_read_db
+from app.models import Book
+from app.schemas import BookCreate, BookUpdate, BookResponse, BookBulkResult, BookSearchResult, \
+    AutocompleteSuggestion
+from app.core.config import BOOK_BULK_CHUNK_SIZE
+from app.core.auth import get_current_user, check_user_role
+from app.services.search import AUTOCOMPLETE_MAX_LIMIT, search_books_async, autocomplete_async
+from app.services.export import EXPORT_FORMATS, parse_columns, books_export_query, stream_rows
+from app.crud import (
+    MAX_BULK_CHUNK_SIZE,
+    create_book_async,
+    bulk_create_books_async,
+    bulk_upsert_books_async,
+    get_all_books_async,
+    estimate_count_async,
+    get_book_by_id_async,
+    get_validators_async,
+    update_book_async,
+    delete_book_async,
+)
 
 router = APIRouter()
 
 @router.post("/", response_model=BookResponse)
-def create_book_endpoint(book: BookCreate, db: Session = Depends(get_db)):
-    return create_book(db, book)
+async def create_book_endpoint(book: BookCreate, db=Depends(get_db)):
+    return await create_book_async(db, book)
+
+@router.post("/bulk", response_model=list[BookBulkResult])
+async def bulk_create_books_endpoint(
+    books: list[BookCreate],
+    chunk_size: int = Query(BOOK_BULK_CHUNK_SIZE, ge=1, le=MAX_BULK_CHUNK_SIZE),
+    db=Depends(get_db),
+):
+    """
+    Creates many books in one transaction. Rows whose ISBN already exists come back as "conflict".
+    """
+    return await bulk_create_books_async(db, books, chunk_size)
+
+@router.patch("/bulk", response_model=list[BookBulkResult])
+async def bulk_upsert_books_endpoint(
+    books: list[BookCreate],
+    chunk_size: int = Query(BOOK_BULK_CHUNK_SIZE, ge=1, le=MAX_BULK_CHUNK_SIZE),
+    db=Depends(get_db),
+):
+    """
+    Creates or updates many books by ISBN in one transaction.
+    """
+    return await bulk_upsert_books_async(db, books, chunk_size)
 
 @router.get("/", response_model=list[BookResponse])
-def get_books_endpoint(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return get_all_books(db, skip=skip, limit=limit)
+async def get_books_endpoint(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    with_total: bool = False,
+    db=Depends(get_read_db),
+):
+    """
+    Lists books. Pass the X-Next-Cursor response header back as `cursor` for the next page;
+    `skip` is kept for older clients. Answers 304 when the page's ETag still matches.
+    """
+    books = await get_all_books_async(db, skip=skip, limit=limit, cursor=cursor, sort=sort)
+    etag = list_etag("books", books, skip, limit, cursor, sort)
+    last_modified = last_modified_of(books)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    total = await estimate_count_async(db, Book) if with_total else None
+    set_pagination_headers(response, books, sort, limit, total)
+    set_validators(response, etag, last_modified)
+    return json_list_response(BookResponse, books, response)
+
+@router.get("/search", response_model=list[BookSearchResult])
+async def search_books_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    db=Depends(get_read_db),
+):
+    """
+    Full-text search over title, description and author names, best matches first.
+    Matched terms are wrapped in <b></b> in title_highlight/description_highlight.
+    """
+    return await search_books_async(db, q, skip=skip, limit=limit)
+
+@router.get("/autocomplete", response_model=list[AutocompleteSuggestion])
+async def autocomplete_endpoint(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=AUTOCOMPLETE_MAX_LIMIT),
+    db=Depends(get_read_db),
+):
+    """
+    Typeahead: book titles and author names starting with `prefix`, alphabetically.
+    """
+    return await autocomplete_async(db, prefix, limit)
+
+@router.get("/export")
+async def export_books_endpoint(
+    format: str = "ndjson",
+    columns: Optional[str] = None,
+    current_user=Depends(get_current_user),
+):
+    """
+    Admins can stream the whole books table as NDJSON or CSV.
+    `columns` is a comma separated subset of the table's columns.
+    """
+    check_user_role(current_user, allowed_roles=["admin"])
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    selected = parse_columns(Book, columns)
+    return StreamingResponse(
+        stream_rows(books_export_query(selected), selected, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=books.{format}"},
+    )
 
 @router.get("/{book_id}", response_model=BookResponse)
-def get_book_endpoint(book_id: int, db: Session = Depends(get_db)):
-    book = get_book_by_id(db, book_id)
+async def get_book_endpoint(book_id: int, request: Request, response: Response, db=Depends(get_read_db)):
+    """
+    Conditional requests (If-None-Match/If-Modified-Since) are checked against the
+    row's version and updated_at only; a 304 never loads or serializes the book.
+    """
+    if is_conditional(request):
+        validators = await get_validators_async(db, "book", Book, book_id)
+        if validators:
+            etag = resource_etag("book", book_id, validators[0])
+            if is_not_modified(request, etag, validators[1]):
+                return not_modified_response(etag, validators[1])
+    book = await get_book_by_id_async(db, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
+    set_validators(response, resource_etag("book", book_id, book["version"]), book["updated_at"])
     return book
 
 @router.put("/{book_id}", response_model=BookResponse)
-def update_book_endpoint(book_id: int, updates: BookUpdate, db: Session = Depends(get_db)):
-    book = update_book(db, book_id, updates)
+async def update_book_endpoint(book_id: int, updates: BookUpdate, db=Depends(get_db)):
+    book = await update_book_async(db, book_id, updates)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     return book
 
 @router.delete("/{book_id}", response_model=BookResponse)
-def delete_book_endpoint(book_id: int, db: Session = Depends(get_db)):
-    book = delete_book(db, book_id)
+async def delete_book_endpoint(book_id: int, db=Depends(get_db)):
+    book = await delete_book_async(db, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     return book
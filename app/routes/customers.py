@@ -1,36 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import Optional
+from app.core.pagination import set_pagination_headers
+from app.core.serialization import json_list_response
+from app.database import get_db, get_read_db
 from app import crud
+from app.models import Customer
 from app.schemas import CustomerCreate, CustomerUpdate, CustomerResponse
 
 router = APIRouter()
 
 @router.get("/", response_model=list[CustomerResponse])
-def get_customers(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_customers(db, skip=skip, limit=limit)
+async def get_customers(
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    with_total: bool = False,
+    db=Depends(get_read_db),
+):
+    customers = await crud.get_customers_async(db, skip=skip, limit=limit, cursor=cursor, sort=sort)
+    total = await crud.estimate_count_async(db, Customer) if with_total else None
+    set_pagination_headers(response, customers, sort, limit, total)
+    return json_list_response(CustomerResponse, customers, response)
 
 @router.get("/{customer_id}", response_model=CustomerResponse)
-def get_customer(customer_id: int, db: Session = Depends(get_db)):
-    customer = crud.get_customer(db, customer_id)
+async def get_customer(customer_id: int, db=Depends(get_read_db)):
+    customer = await crud.get_customer_async(db, customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     return customer
 
 @router.post("/", response_model=CustomerResponse)
-def create_customer(customer: CustomerCreate, db: Session = Depends(get_db)):
-    return crud.create_customer(db, customer)
+async def create_customer(customer: CustomerCreate, db=Depends(get_db)):
+    return await crud.create_customer_async(db, customer)
 
 @router.put("/{customer_id}", response_model=CustomerResponse)
-def update_customer(customer_id: int, customer: CustomerUpdate, db: Session = Depends(get_db)):
-    updated_customer = crud.update_customer(db, customer_id, customer)
+async def update_customer(customer_id: int, customer: CustomerUpdate, db=Depends(get_db)):
+    updated_customer = await crud.update_customer_async(db, customer_id, customer)
     if not updated_customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     return updated_customer
 
 @router.delete("/{customer_id}", response_model=CustomerResponse)
-def delete_customer(customer_id: int, db: Session = Depends(get_db)):
-    deleted_customer = crud.delete_customer(db, customer_id)
+async def delete_customer(customer_id: int, db=Depends(get_db)):
+    deleted_customer = await crud.delete_customer_async(db, customer_id)
     if not deleted_customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     return deleted_customer
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from app.database import get_db, run_db
+from app.core.health import check_readiness
+
+router = APIRouter()
+
+@router.get("/healthz")
+async def healthz():
+    """
+    Liveness: the process is up and serving requests. Never touches the database.
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz(db=Depends(get_db)):
+    """
+    Readiness: the database is reachable and migrations are at head.
+    """
+    ready, details = await run_db(db, check_readiness)
+    return JSONResponse(
+        content={"status": "ready" if ready else "not ready", **details},
+        status_code=200 if ready else 503,
+    )
@@ -1,21 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
 from app.database import get_db
 from app.models import Customer
 from app.core.auth import get_current_user,get_current_customer
-from app.services.membership import upgrade_membership  # from services folder
+from app.core.idempotency import idempotent
+from app.services.membership import upgrade_membership_async  # from services folder
 
 router = APIRouter()
 
 @router.post("/upgrade-membership")
-def upgrade_membership_route(membership_type: str, db: Session = Depends(get_db), current_customer=Depends(get_current_customer),):
+async def upgrade_membership_route(
+    membership_type: str,
+    request: Request,
+    response: Response,
+    db=Depends(get_db),
+    current_customer=Depends(get_current_customer),
+    idempotency_key: Optional[str] = Header(None),
+):
     """
     API endpoint for customers to upgrade their membership to plus or premium.
+    Retries with the same Idempotency-Key header get the first response back.
     """
-    # Get the customer's profile
-    upgraded_customer = upgrade_membership(db, current_customer, membership_type)
-    return {
-        "message": f"Membership upgraded to {membership_type}",
-        "new_balance": upgraded_customer.wallet_money_amount,
-        "expires_at": upgraded_customer.subscription_end_time,
-    }
\ No newline at end of file
+    async def upgrade():
+        upgraded_customer = await upgrade_membership_async(db, current_customer, membership_type)
+        return {
+            "message": f"Membership upgraded to {membership_type}",
+            "new_balance": upgraded_customer.wallet_money_amount,
+            "expires_at": upgraded_customer.subscription_end_time,
+        }
+
+    return await idempotent(request, response, db, idempotency_key, current_customer.user_id, upgrade)
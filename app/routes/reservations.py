@@ -1,71 +1,118 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from typing import Optional
+from fastapi.responses import StreamingResponse
+from datetime import date
+from app.core.pagination import set_pagination_headers
+from app.core.serialization import json_list_response
+from app.database import get_db, get_read_db
 from app.crud import (
-    get_reservations,
-    get_reservation,
-    create_reservation,
-    update_reservation,
-    delete_reservation,
+    get_reservations_async,
+    estimate_count_async,
+    get_reservation_async,
+    create_reservation_async,
+    update_reservation_async,
+    delete_reservation_async,
 )
+from app.models import Reservation
 from app.schemas import ReservationCreate, ReservationUpdate, ReservationResponse
-from app.core.auth import get_current_customer
-from app.services.reservations import reserve_book,exit_reservation_queue
+from app.core.auth import get_current_customer, get_current_user, check_user_role
+from app.core.rate_limit import limit_by_user, RESERVE_LIMIT
+from app.core.idempotency import idempotent
+from app.services.export import EXPORT_FORMATS, parse_columns, reservations_export_query, stream_rows
+from app.services.reservations import reserve_book_async,exit_reservation_queue_async
 
 router = APIRouter()
 
 @router.get("/", response_model=list[ReservationResponse])
-def get_reservations_route(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return get_reservations(db, skip=skip, limit=limit)
+async def get_reservations_route(
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    with_total: bool = False,
+    db=Depends(get_read_db),
+):
+    reservations = await get_reservations_async(db, skip=skip, limit=limit, cursor=cursor, sort=sort)
+    total = await estimate_count_async(db, Reservation) if with_total else None
+    set_pagination_headers(response, reservations, sort, limit, total)
+    return json_list_response(ReservationResponse, reservations, response)
+
+@router.get("/export")
+async def export_reservations_route(
+    format: str = "ndjson",
+    columns: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_user=Depends(get_current_user),
+):
+    """
+    Admins can stream reservations as NDJSON or CSV.
+    - date_from/date_to filter on start_date (inclusive).
+    - columns is a comma separated subset of the table's columns.
+    """
+    check_user_role(current_user, allowed_roles=["admin"])
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    selected = parse_columns(Reservation, columns)
+    return StreamingResponse(
+        stream_rows(reservations_export_query(selected, date_from, date_to), selected, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=reservations.{format}"},
+    )
 
 @router.get("/{reservation_id}", response_model=ReservationResponse)
-def get_reservation_route(reservation_id: int, db: Session = Depends(get_db)):
-    reservation = get_reservation(db, reservation_id)
+async def get_reservation_route(reservation_id: int, db=Depends(get_read_db)):
+    reservation = await get_reservation_async(db, reservation_id)
     if not reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
     return reservation
 
-@router.post("/", response_model=ReservationResponse)
-def create_reservation_route(
+@router.post("/", response_model=ReservationResponse, dependencies=[Depends(limit_by_user(RESERVE_LIMIT))])
+async def create_reservation_route(
     reservation_data: ReservationCreate,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db=Depends(get_db),
     current_customer=Depends(get_current_customer),
+    idempotency_key: Optional[str] = Header(None),
 ):
     """
     Handles reservation creation.
     - Enforces membership-based limits.
     - Deducts money from wallet.
     - If book is unavailable, queues the user.
+    - Retries with the same Idempotency-Key header get the first response back.
     """
-    reservation_or_queue = reserve_book(db, current_customer, reservation_data)
-
-    if isinstance(reservation_or_queue, dict):  # If the function returns a queue message
-        return JSONResponse(content=reservation_or_queue, status_code=200)
+    async def reserve():
+        reservation_or_queue = await reserve_book_async(db, current_customer, reservation_data)
+        if isinstance(reservation_or_queue, dict):  # If the function returns a queue message
+            return reservation_or_queue
+        return ReservationResponse.model_validate(reservation_or_queue).model_dump(mode="json")
 
-    return reservation_or_queue  # Otherwise, return the reservation as normal
+    return await idempotent(request, response, db, idempotency_key, current_customer.user_id, reserve)
 
 @router.put("/{reservation_id}", response_model=ReservationResponse)
-def update_reservation_route(reservation_id: int, reservation: ReservationUpdate, db: Session = Depends(get_db)):
-    updated_reservation = update_reservation(db, reservation_id, reservation)
+async def update_reservation_route(reservation_id: int, reservation: ReservationUpdate, db=Depends(get_db)):
+    updated_reservation = await update_reservation_async(db, reservation_id, reservation)
     if not updated_reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
     return updated_reservation
 
 @router.delete("/{reservation_id}", response_model=ReservationResponse)
-def delete_reservation_route(reservation_id: int, db: Session = Depends(get_db)):
-    deleted_reservation = delete_reservation(db, reservation_id)
+async def delete_reservation_route(reservation_id: int, db=Depends(get_db)):
+    deleted_reservation = await delete_reservation_async(db, reservation_id)
     if not deleted_reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
     return deleted_reservation
 
 @router.delete("/queue/exit/{book_id}")
-def exit_queue_route(
+async def exit_queue_route(
     book_id: int,
-    db: Session = Depends(get_db),
+    db=Depends(get_db),
     current_customer=Depends(get_current_customer),
 ):
     """
     Allows a user to remove themselves from the reservation queue.
     """
-    return exit_reservation_queue(db, current_customer, book_id)
+    return await exit_reservation_queue_async(db, current_customer, book_id)
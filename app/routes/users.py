@@ -1,22 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import Optional
+from app.core.pagination import set_pagination_headers
+from app.core.serialization import json_list_response
 from app.database import get_db
 from app.schemas import UserCreate, UserResponse
-from app.crud import get_user_id, get_all_users, create_user, update_user, delete_user
+from app.crud import get_user_id_async, get_all_users_async, estimate_count_async, create_user_async, update_user_async, delete_user_async
 from app.models import User
 from app.core.auth import get_current_user,check_user_role
 
 router = APIRouter()
 
 @router.post("/", response_model=UserResponse)
-def create_user_endpoint(user: UserCreate, db: Session = Depends(get_db),current_user: User = Depends(get_current_user),):
+async def create_user_endpoint(user: UserCreate, db=Depends(get_db),current_user: User = Depends(get_current_user),):
     check_user_role(current_user, allowed_roles=['ADMIN'])
-    return create_user(db, user)
+    return await create_user_async(db, user)
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user_endpoint(user_id: int, db: Session = Depends(get_db),current_user: User = Depends(get_current_user),):
+async def get_user_endpoint(user_id: int, db=Depends(get_db),current_user: User = Depends(get_current_user),):
     # Admin can fetch any user data and user are able to access their own data
-    user = get_user_id(db, user_id)
+    user = await get_user_id_async(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if current_user.user_role != "ADMIN" and current_user.id != user.id:
@@ -24,29 +26,41 @@ def get_user_endpoint(user_id: int, db: Session = Depends(get_db),current_user:
     return user
 
 @router.get("/", response_model=list[UserResponse])
-def get_all_users_endpoint(skip: int = 0, limit: int = 10, db: Session = Depends(get_db),current_user: User = Depends(get_current_user)):
+async def get_all_users_endpoint(
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    with_total: bool = False,
+    db=Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
     # Only ADMIN can view all users
     check_user_role(current_user, allowed_roles=["ADMIN"])
-    return get_all_users(db, skip=skip, limit=limit)
+    users = await get_all_users_async(db, skip=skip, limit=limit, cursor=cursor, sort=sort)
+    total = await estimate_count_async(db, User) if with_total else None
+    set_pagination_headers(response, users, sort, limit, total)
+    return json_list_response(UserResponse, users, response)
 
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user_endpoint(user_id: int, updates: dict, db: Session = Depends(get_db),current_user: User = Depends(get_current_user)):
+async def update_user_endpoint(user_id: int, updates: dict, db=Depends(get_db),current_user: User = Depends(get_current_user)):
     # Allow both ADMIN and the user themselves to update their data
-    user = get_user_id(db, user_id)
+    user = await get_user_id_async(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if current_user.user_role != "ADMIN" and current_user.id != user.id:
         raise HTTPException(status_code=403, detail="Permission denied")
-    return update_user(db, user_id, updates)
+    return await update_user_async(db, user_id, updates)
 
 @router.delete("/{user_id}", response_model=UserResponse)
-def delete_user_endpoint(
+async def delete_user_endpoint(
     user_id: int,
-    db: Session = Depends(get_db),
+    db=Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     # Check if the user exists
-    user = get_user_id(db, user_id)
+    user = await get_user_id_async(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -57,5 +71,5 @@ def delete_user_endpoint(
             detail="You do not have permission to delete this user.",
         )
     # Proceed with deletion
-    delete_user(db, user_id)
-    return user
\ No newline at end of file
+    await delete_user_async(db, user_id)
+    return user
@@ -1,29 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
 from app.database import get_db
 from app.models import User, Customer
-from app.core.auth import get_current_user,get_current_customer
-from app.services.wallet import add_money_to_wallet
+from app.core.auth import get_current_user,get_current_customer,get_current_principal
+from app.core.idempotency import idempotent
+from app.services.wallet import add_money_to_wallet_async
 
 router = APIRouter()
 
 @router.post("/add-money")
-def add_money_route(
+async def add_money_route(
     amount: float,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    db=Depends(get_db),
+    principal=Depends(get_current_principal),
+    idempotency_key: Optional[str] = Header(None),
 ):
     """
     API for customers to add money to their wallet.
+    Retries with the same Idempotency-Key header get the first response back.
     """
     # Check if the current user is a customer
-    customer = db.query(Customer).filter(Customer.user_id == current_user.id).first()
+    customer = principal.customer
     if not customer:
         raise HTTPException(status_code=400, detail="Only customers can add money to their wallet")
 
-    updated_customer = add_money_to_wallet(db, customer.id, amount)
+    async def add_money():
+        updated_customer = await add_money_to_wallet_async(db, customer.id, amount)
+        return {
+            "message": "Money added successfully",
+            "new_balance": updated_customer.wallet_money_amount
+        }
 
-    return {
-        "message": "Money added successfully",
-        "new_balance": updated_customer.wallet_money_amount
-    }
+    return await idempotent(request, response, db, idempotency_key, principal.user.id, add_money)
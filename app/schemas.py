@@ -1,4 +1,4 @@
-from pydantic import BaseModel,EmailStr
+from pydantic import BaseModel,ConfigDict,EmailStr,field_validator
 from typing import Optional,List
 from datetime import date
 
@@ -18,22 +18,19 @@ class UserResponse(UserBase):
     id: int
     user_role: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class GenreResponse(BaseModel):
     id: int
     name: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class CityResponse(BaseModel):
     id: int
     name: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class BookBase(BaseModel):
     title: str
@@ -57,8 +54,23 @@ class BookResponse(BookBase):
     id: int
     author_id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class BookSearchResult(BookResponse):
+    rank: float
+    title_highlight: str
+    description_highlight: Optional[str] = None
+
+class AutocompleteSuggestion(BaseModel):
+    text: str
+    kind: str  # book | author
+    id: int
+
+class BookBulkResult(BaseModel):
+    index: int  # position of the row in the request body
+    isbn: str
+    id: Optional[int] = None
+    status: str  # created | updated | conflict | duplicate | invalid_author
 
 class AuthorBase(BaseModel):
     user_id: int
@@ -78,8 +90,13 @@ class AuthorResponse(AuthorBase):
     id: int
     books: Optional[List[int]] = []  # Book IDs authored by this author
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+    @field_validator("books", mode="before")
+    @classmethod
+    def book_ids(cls, books):
+        # ORM authors carry Book objects, cached snapshots already carry ids
+        return [getattr(book, "id", book) for book in books] if books is not None else books
 
 class ReservationBase(BaseModel):
     book_id: int
@@ -98,8 +115,7 @@ class ReservationUpdate(BaseModel):
 class ReservationResponse(ReservationBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Customer schema
 class CustomerBase(BaseModel):
@@ -118,9 +134,9 @@ class CustomerUpdate(BaseModel):
 
 class CustomerResponse(CustomerBase):
     id: int
+    active_reservations: int = 0
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # JWT schemas
 class Token(BaseModel):
@@ -143,13 +159,12 @@ class Login(BaseModel):
     username: str
     password: str
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "username": "root",
-                "password": "rootroot"
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "username": "root",
+            "password": "rootroot"
         }
+    })
 
     def validate_login(self):
         if not self.username:
@@ -0,0 +1,127 @@
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from app.models import User, Reservation, Book, ReservationQueue
+from app.core.cache import invalidate_on_commit
+from app.core.principal import principal_cache, principal_key
+from app.services.reservations import return_book
+from app.database import run_db
+
+
+def revoke_user_token(db: Session, user_id: int):
+    """
+    Revokes a user's access token except for other admins.
+    Effective immediately on this worker; other workers keep accepting the old tokens
+    until their cached principal expires (PRINCIPAL_CACHE_TTL), unless cache
+    invalidation is shared through CATALOG_CACHE_NOTIFY.
+    """
+    # Fetch the user to be revoked
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Ensure admins cannot revoke other admins' tokens
+    if user.user_role.lower() == "admin":
+        raise HTTPException(status_code=403, detail="Cannot revoke another admin’s token.")
+
+    # Every token carries the version it was issued with, bumping it invalidates them all
+    user.token_version = User.token_version + 1
+    invalidate_on_commit(db, principal_cache, principal_key(user.id))
+    db.commit()
+
+    return {"message": f"Token for user {user.username} has been revoked."}
+
+
+def end_reservation_early(db: Session, reservation_id: int):
+    """
+    Forcefully ends a user's reservation before its scheduled end time.
+    The book is restocked and handed to the waitlist right away, like a return.
+    """
+    if not db.query(Reservation.id).filter(Reservation.id == reservation_id).first():
+        raise HTTPException(status_code=404, detail="Reservation not found")
+
+    return_book(db, reservation_id)
+    return {"message": f"Reservation {reservation_id} has been ended early."}
+
+
+def get_book_reservations(db: Session, book_id: int):
+    """
+    Returns a book's current holders and scheduled reservers in queue.
+    """
+    book = db.query(Book).filter(Book.id == book_id).first()
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    # Get active reservations
+    active_reservations = (
+        db.query(Reservation)
+        .filter(Reservation.book_id == book_id)
+        .all()
+    )
+
+    # Get users in queue, in promotion order
+    queue_users = (
+        db.query(ReservationQueue)
+        .filter(ReservationQueue.book_id == book_id)
+        .order_by(ReservationQueue.priority.desc(), ReservationQueue.created_at.asc())
+        .all()
+    )
+
+    return {
+        "active_reservations": [
+            {"user_id": res.customer_id, "start_date": res.start_date, "end_date": res.end_date}
+            for res in active_reservations
+        ],
+        "queue_users": [
+            {"user_id": queue.customer_id, "queued_at": queue.created_at}
+            for queue in queue_users
+        ],
+    }
+
+
+def remove_user_from_reservation_or_queue(db: Session, book_id: int, user_id: int):
+    """
+    Removes a user from a reservation or waiting queue.
+    A removed reservation is ended like a return: the unit and the customer's
+    reservation slot are given back and the waitlist is promoted.
+    """
+    # Check if user has an active reservation
+    reservation_id = (
+        db.query(Reservation.id)
+        .filter(Reservation.book_id == book_id, Reservation.customer_id == user_id)
+        .order_by(Reservation.id)
+        .limit(1)  # a customer may hold several reservations of the same book, one is removed per call
+        .scalar()
+    )
+    if reservation_id is not None:
+        return_book(db, reservation_id)
+        return {"message": f"User:{user_id} removed from active reservation for book:{book_id}"}
+
+    # Check if user is in queue
+    queue_entry = (
+        db.query(ReservationQueue)
+        .filter(ReservationQueue.book_id == book_id, ReservationQueue.customer_id == user_id)
+        .first()
+    )
+    if queue_entry:
+        db.delete(queue_entry)
+        db.commit()
+        return {"message": f"User {user_id} removed from reservation queue for book {book_id}"}
+
+    raise HTTPException(status_code=404, detail="User not found in reservations or queue")
+
+
+# ----------------------------------------
+# Async variants (used by the routers, see app.database.run_db)
+# ----------------------------------------
+
+async def revoke_user_token_async(db, user_id: int):
+    return await run_db(db, revoke_user_token, user_id)
+
+async def end_reservation_early_async(db, reservation_id: int):
+    return await run_db(db, end_reservation_early, reservation_id)
+
+async def get_book_reservations_async(db, book_id: int):
+    return await run_db(db, get_book_reservations, book_id)
+
+async def remove_user_from_reservation_or_queue_async(db, book_id: int, user_id: int):
+    return await run_db(db, remove_user_from_reservation_or_queue, book_id, user_id)
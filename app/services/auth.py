@@ -0,0 +1,56 @@
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from app.models import User, Customer
+from app.schemas import SignUp
+from app.database import run_db
+
+
+def register_user(db: Session, user: SignUp, hashed_password: str):
+    """
+    Creates a new user and, for customers, their free customer profile.
+    The password is hashed by the caller so bcrypt never runs on the event loop.
+    """
+    # Check if username or email already exists
+    existing_user = db.query(User).filter(
+        (User.username == user.username) | (User.email == user.email)
+    ).first()
+    if existing_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username or email already exists",
+        )
+
+    # Create the new user
+    new_user = User(
+        username=user.username,
+        email=user.email,
+        password=hashed_password,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        phone=user.phone,
+        user_role=user.user_role,
+    )
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+
+    if new_user.user_role.lower() == "customer":
+        new_customer = Customer(
+            user_id=new_user.id,
+            subscription_model="free",  # Default new customers to "free"
+            subscription_end_time=None,
+            wallet_money_amount=0.0,  # New customers start with 0 money
+        )
+        db.add(new_customer)
+        db.commit()
+        db.refresh(new_customer)
+
+    return new_user
+
+
+# ----------------------------------------
+# Async variants (used by the routers, see app.database.run_db)
+# ----------------------------------------
+
+async def register_user_async(db, user: SignUp, hashed_password: str):
+    return await run_db(db, register_user, user, hashed_password)
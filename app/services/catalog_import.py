@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from app.models import Author, User
+from app.schemas import BookCreate
+from app.crud import bulk_create_books
+from app.core.config import BOOK_BULK_CHUNK_SIZE
+
+# Only the first errors are kept so the summary stays small on very dirty files
+MAX_REPORTED_ERRORS = 100
+
+
+def iter_rows(stream, file_format: str):
+    """
+    Lazily yields (line_number, row dict) from a CSV or JSONL text stream.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError:
+                    yield line_number, None
+    else:
+        raise ValueError(f"Unsupported import format: {file_format}")
+
+
+def iter_batches(rows, batch_size: int):
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def resolve_author_ids(db: Session, usernames):
+    """
+    Maps author usernames to author ids with one query per batch.
+    """
+    if not usernames:
+        return {}
+    return dict(
+        db.query(User.username, Author.id)
+        .join(Author, Author.user_id == User.id)
+        .filter(User.username.in_(usernames))
+    )
+
+
+def validate_batch(db: Session, batch, summary):
+    """
+    Validates raw rows against BookCreate. Rows may give `author_id` directly
+    or `author` as the author's username, resolved in bulk.
+    Returns (line_number, BookCreate) pairs for the valid rows.
+    """
+    usernames = {row["author"] for _, row in batch if isinstance(row, dict) and row.get("author") and not row.get("author_id")}
+    author_ids = resolve_author_ids(db, usernames)
+
+    books = []
+    for line_number, row in batch:
+        if not isinstance(row, dict):
+            record_error(summary, line_number, "Malformed row")
+            continue
+        if not row.get("author_id") and row.get("author"):
+            row["author_id"] = author_ids.get(row["author"])
+            if row["author_id"] is None:
+                record_error(summary, line_number, f"Unknown author {row['author']!r}")
+                continue
+        # CSV gives empty strings for missing optional columns
+        row = {key: value for key, value in row.items() if value != ""}
+        try:
+            books.append((line_number, BookCreate(**row)))
+        except ValidationError as e:
+            record_error(summary, line_number, e.errors()[0]["msg"])
+    return books
+
+
+def record_error(summary, line_number: int, message: str):
+    summary["invalid"] += 1
+    if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+        summary["errors"].append({"line": line_number, "error": message})
+
+
+def load_checkpoint(path: str):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def save_checkpoint(path: str, summary):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f)
+    os.replace(tmp_path, path)  # atomic, a crash never leaves a half-written checkpoint
+
+
+def import_books(db: Session, stream, file_format: str, batch_size: int = BOOK_BULK_CHUNK_SIZE,
+                 checkpoint_path: str = None):
+    """
+    Streams a catalog file into `books`, one committed batch at a time.
+    - Memory is bounded by batch_size, not by file size.
+    - Existing ISBNs are skipped via the books.isbn unique index (ON CONFLICT DO NOTHING).
+    - After every batch the progress is written to checkpoint_path; running again with
+      the same checkpoint skips the rows already processed.
+    Yields the running summary after each batch, so callers can report progress.
+    """
+    summary = load_checkpoint(checkpoint_path) or {
+        "rows_done": 0, "created": 0, "conflicts": 0, "invalid": 0, "errors": [], "finished": False,
+    }
+    if summary["finished"]:
+        yield summary
+        return
+
+    rows = islice(iter_rows(stream, file_format), summary["rows_done"], None)
+    for batch in iter_batches(rows, batch_size):
+        books = validate_batch(db, batch, summary)
+        if books:
+            results = bulk_create_books(db, [book for _, book in books], batch_size)
+            for (line_number, _), result in zip(books, results):
+                if result["status"] == "created":
+                    summary["created"] += 1
+                elif result["status"] == "conflict":
+                    summary["conflicts"] += 1
+                else:
+                    record_error(summary, line_number, result["status"])
+        summary["rows_done"] += len(batch)
+        save_checkpoint(checkpoint_path, summary)
+        yield summary
+
+    summary["finished"] = True
+    save_checkpoint(checkpoint_path, summary)
+    yield summary
+
+
+def open_text(path: str):
+    """
+    Opens an import file for streaming text reads (newline="" as the csv module expects).
+    """
+    return io.open(path, "r", encoding="utf-8-sig", newline="")
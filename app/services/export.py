@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+from datetime import date
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import select
+from app.database import SessionLocal
+from app.models import Book, Reservation
+
+# Rows fetched per server-side cursor round trip, and rows per streamed chunk
+EXPORT_YIELD_PER = 1000
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def parse_columns(model, columns: Optional[str]):
+    """
+    Validates a comma separated column list against the model's table.
+    """
+    available = list(model.__table__.columns.keys())
+    if not columns:
+        return available
+    requested = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in requested if c not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}. Allowed: {', '.join(available)}")
+    return requested
+
+
+def books_export_query(columns):
+    return select(*[Book.__table__.c[c] for c in columns]).order_by(Book.id)
+
+
+def reservations_export_query(columns, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """
+    Reservations whose start_date falls inside [date_from, date_to].
+    """
+    query = select(*[Reservation.__table__.c[c] for c in columns]).order_by(Reservation.id)
+    if date_from:
+        query = query.where(Reservation.start_date >= date_from)
+    if date_to:
+        query = query.where(Reservation.start_date <= date_to)
+    return query
+
+
+def stream_rows(query, columns, file_format: str):
+    """
+    Yields the export body in chunks. Rows come from a server-side cursor
+    (yield_per implies stream_results), so memory stays constant for any table size.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=EXPORT_YIELD_PER))
+        if file_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for partition in result.partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            for partition in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in partition
+                )
+    finally:
+        db.close()
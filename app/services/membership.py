@@ -1,7 +1,10 @@
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from app.models import Customer
+from app.models import Customer, ReservationQueue
+from app.database import run_db
+from app.services.wallet import debit_wallet
+from app.services.reservations import QUEUE_PRIORITY
 
 # Membership pricing
 # Membership pricing (Ensure keys are uppercase)
@@ -22,18 +25,31 @@ def upgrade_membership(db: Session, customer: Customer, membership_type: str):
 
     membership_price = MEMBERSHIP_PRICING[membership_type]  # Now it won't raise KeyError
 
-    # Check if customer has enough balance
-    if customer.wallet_money_amount < membership_price:
+    # The authenticated customer is a cached snapshot: act on the current row
+    customer = db.query(Customer).filter(Customer.id == customer.id).first()
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    # Waiting entries move up with the new membership. Updated before the debit so locks are
+    # taken in the same order as waitlist promotion (queue rows, then the customer row)
+    db.query(ReservationQueue).filter(ReservationQueue.customer_id == customer.id).update(
+        {ReservationQueue.priority: QUEUE_PRIORITY[membership_type.lower()]}, synchronize_session=False
+    )
+
+    # Deduct money from wallet and set the membership type & expiration date (30 days from now)
+    # in one guarded UPDATE, so concurrent debits cannot overdraw the wallet
+    if not debit_wallet(
+        db, customer.id, customer.user_id, membership_price,
+        subscription_model=membership_type.lower(),  # Store in lowercase
+        subscription_end_time=datetime.utcnow() + timedelta(days=30),
+    ):
+        db.rollback()  # keeps the old queue priority
         raise HTTPException(status_code=400, detail="Not enough wallet balance.")
-
-    # Deduct money from wallet
-    customer.wallet_money_amount -= membership_price
-
-    # Set the membership type & expiration date (30 days from now)
-    customer.subscription_model = membership_type.lower()  # Store in lowercase
-    customer.subscription_end_time = datetime.utcnow() + timedelta(days=30)
-
     db.commit()
     db.refresh(customer)
 
     return customer
+
+
+async def upgrade_membership_async(db, customer: Customer, membership_type: str):
+    return await run_db(db, upgrade_membership, customer, membership_type)
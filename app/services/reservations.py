@@ -1,9 +1,18 @@
+from collections import Counter
+import logging
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from fastapi import HTTPException
 from app.models import Book, Reservation, Customer, ReservationQueue
 from app.schemas import ReservationCreate
 from app.core.membership_validation import check_membership_permissions
+from app.database import run_db
+from app.core.cache import catalog_cache, invalidate_on_commit
+from app.core.config import QUEUE_PROMOTION_BATCH_SIZE
+from app.services.wallet import debit_wallet
+
+logger = logging.getLogger(__name__)
 
 # Membership Reservation Limits
 MEMBERSHIP_LIMITS = {
@@ -12,6 +21,56 @@ MEMBERSHIP_LIMITS = {
     "premium": {"max_days": 14, "max_books": 10, "price_per_day": 1000},
 }
 
+# Waitlist order: higher is promoted first. Set when the customer joins the queue
+# and updated on membership upgrades.
+QUEUE_PRIORITY = {"free": 0, "plus": 1, "premium": 2}
+
+def take_book_unit(db: Session, book_id: int, count: int = 1) -> bool:
+    """
+    Atomically takes `count` units of a book: UPDATE ... WHERE units >= count.
+    The row lock lasts until the caller's commit, so concurrent takers never oversell.
+    """
+    taken = db.query(Book).filter(Book.id == book_id, Book.units >= count).update(
+        {Book.units: Book.units - count, Book.version: Book.version + 1, Book.updated_at: datetime.utcnow()},
+        synchronize_session=False,
+    )
+    if taken:
+        invalidate_on_commit(db, catalog_cache, ("book", book_id))
+    return bool(taken)
+
+def release_book_unit(db: Session, book_id: int, count: int = 1):
+    db.query(Book).filter(Book.id == book_id).update(
+        {Book.units: Book.units + count, Book.version: Book.version + 1, Book.updated_at: datetime.utcnow()},
+        synchronize_session=False,
+    )
+    invalidate_on_commit(db, catalog_cache, ("book", book_id))
+
+def charge_reservation(db: Session, customer_id: int, user_id: int, price, max_books: int) -> bool:
+    """
+    Debits the price and takes one of the customer's `max_books` reservation slots
+    in a single guarded UPDATE: fails when the wallet is short or every slot is taken.
+    """
+    return debit_wallet(
+        db, customer_id, user_id, price, Customer.active_reservations < max_books,
+        active_reservations=Customer.active_reservations + 1,
+    )
+
+def release_reservation_slots(db: Session, counts: Counter):
+    """
+    Gives back reservation slots, `counts` maps customer id -> ended reservations.
+    One grouped UPDATE for any number of customers; counters never go below zero.
+    """
+    if len(counts) > 1:
+        # Lock in id order, so concurrent batches sharing customers cannot deadlock
+        db.query(Customer.id).filter(Customer.id.in_(counts)).order_by(Customer.id).with_for_update().all()
+    ended = case(counts, value=Customer.id, else_=0)
+    db.query(Customer).filter(Customer.id.in_(counts)).update(
+        {Customer.active_reservations: case(
+            (Customer.active_reservations > ended, Customer.active_reservations - ended), else_=0,
+        )},
+        synchronize_session=False,
+    )
+
 def reserve_book(db: Session, customer: Customer, reservation_data: ReservationCreate):
     """
     Handles book reservations:
@@ -19,11 +78,19 @@ def reserve_book(db: Session, customer: Customer, reservation_data: ReservationC
     - Deducts money from wallet.
     - Checks book availability.
     - If the book is unavailable, queues the user.
+    The unit, the money and the reservation slot are taken with guarded UPDATEs in
+    one transaction, so concurrent requests can neither oversell a book, overdraw
+    a wallet nor exceed the membership's reservation limit.
     """
-
-    book = db.query(Book).filter(Book.id == reservation_data.book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
+    # The authenticated customer is a cached snapshot: read the current values (no lock)
+    customer = (
+        db.query(Customer.id, Customer.user_id, Customer.subscription_model, Customer.wallet_money_amount,
+                 Customer.active_reservations)
+        .filter(Customer.id == customer.id)
+        .first()
+    )
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
 
     # Enforce membership permissions
     check_membership_permissions(customer, db)
@@ -32,9 +99,9 @@ def reserve_book(db: Session, customer: Customer, reservation_data: ReservationC
     membership = customer.subscription_model.lower()
     membership_rules = MEMBERSHIP_LIMITS.get(membership)
 
-    # Ensure the user does not exceed max reservations
-    active_reservations = db.query(Reservation).filter(Reservation.customer_id == customer.id).count()
-    if active_reservations >= membership_rules["max_books"]:
+    # Ensure the user does not exceed max reservations (fast rejection, also before queueing;
+    # charge_reservation re-checks atomically)
+    if customer.active_reservations >= membership_rules["max_books"]:
         raise HTTPException(status_code=403, detail="You have reached your reservation limit.")
 
     # Calculate reservation duration
@@ -47,13 +114,18 @@ def reserve_book(db: Session, customer: Customer, reservation_data: ReservationC
     # Calculate cost
     total_price = reservation_duration * membership_rules["price_per_day"]
 
-    # Check wallet balance
+    # Fast rejection; the debit below re-checks atomically
     if customer.wallet_money_amount < total_price:
         raise HTTPException(status_code=400, detail="Insufficient funds. Please add money to your wallet.")
 
     # If the book has available units → Reserve immediately
-    if book.units > 0:
-        book.units -= 1  # Reduce available book units
+    if take_book_unit(db, reservation_data.book_id):
+        if not charge_reservation(db, customer.id, customer.user_id, total_price, membership_rules["max_books"]):
+            db.rollback()  # gives the unit back
+            active = db.query(Customer.active_reservations).filter(Customer.id == customer.id).scalar()
+            if active is not None and active >= membership_rules["max_books"]:
+                raise HTTPException(status_code=403, detail="You have reached your reservation limit.")
+            raise HTTPException(status_code=400, detail="Insufficient funds. Please add money to your wallet.")
         new_reservation = Reservation(
             customer_id=customer.id,  # FIXED: Correct Foreign Key Reference
             book_id=reservation_data.book_id,
@@ -62,82 +134,205 @@ def reserve_book(db: Session, customer: Customer, reservation_data: ReservationC
             price=total_price
         )
         db.add(new_reservation)
-
-        # Deduct money from wallet
-        customer.wallet_money_amount -= total_price
-
         db.commit()
         db.refresh(new_reservation)
         return new_reservation
 
+    if not db.query(Book.id).filter(Book.id == reservation_data.book_id).first():
+        raise HTTPException(status_code=404, detail="Book not found")
+
     # If the book is unavailable → Add user to the queue
     new_queue_entry = ReservationQueue(
         customer_id=customer.id,  # FIXED: Correct Foreign Key Reference
         book_id=reservation_data.book_id,
-        created_at=datetime.utcnow()
+        created_at=datetime.utcnow(),
+        priority=QUEUE_PRIORITY.get(membership, 0),
     )
     db.add(new_queue_entry)
     db.commit()
     return {"message": "Book is currently unavailable. You have been added to the waiting list."}
 
-def process_reservation_queue(db: Session, book_id: int):
+def process_reservation_queue(db: Session, book_id: int, batch_size: int = QUEUE_PROMOTION_BATCH_SIZE) -> int:
     """
-    Assigns a reserved book to the first user in the queue.
-    - Premium users get priority.
-    - If two users have the same level, the oldest request gets priority.
+    Promotes waiting customers to reservations while the book has free units.
+    - Highest priority first (premium, plus, free), then the oldest request.
+    - Customers who cannot afford the 7-day reservation or have reached their
+      reservation limit are dropped from the queue.
+    Iterative and batched: each round claims as many units as it has candidates
+    and commits once. Candidates are locked with FOR UPDATE SKIP LOCKED, so
+    concurrent returns of the same book split the queue instead of waiting.
+    Returns the number of promoted customers.
     """
+    promoted = 0
+    while True:
+        units = db.query(Book.units).filter(Book.id == book_id).scalar()
+        if not units:
+            return promoted
 
-    next_in_queue = (
-        db.query(ReservationQueue)
-        .join(Customer, ReservationQueue.customer_id == Customer.id)
-        .filter(ReservationQueue.book_id == book_id)
-        .order_by(
-            Customer.subscription_model.desc(),  # Premium users first
-            ReservationQueue.created_at.asc()  # Older requests get priority
+        candidates = (
+            db.query(ReservationQueue.id, ReservationQueue.customer_id, Customer.user_id,
+                     Customer.subscription_model, Customer.wallet_money_amount, Customer.active_reservations)
+            .join(Customer, ReservationQueue.customer_id == Customer.id)
+            .filter(ReservationQueue.book_id == book_id)
+            .order_by(ReservationQueue.priority.desc(), ReservationQueue.created_at.asc())
+            .limit(batch_size)
+            .with_for_update(of=ReservationQueue, skip_locked=True)
+            .all()
         )
-        .first()
-    )
+        if not candidates:
+            db.rollback()
+            return promoted
 
-    if next_in_queue:
-        customer = db.query(Customer).filter(Customer.id == next_in_queue.customer_id).first()
-        book = db.query(Book).filter(Book.id == book_id).first()
+        # Lock order: queue rows, book, customers. reserve_book takes book then customer and
+        # upgrade_membership queue rows then customer, so no two paths wait on each other
+        claimed = min(units, len(candidates))
+        if not take_book_unit(db, book_id, claimed):
+            db.rollback()  # units were taken meanwhile, look again
+            continue
 
-        price = MEMBERSHIP_LIMITS[customer.subscription_model]["price_per_day"] * 7
-        if customer.wallet_money_amount < price:
-            db.delete(next_in_queue)  # Remove from queue if the user cannot afford
-            db.commit()
-            return process_reservation_queue(db, book_id)  # Try the next person in line
+        now = datetime.utcnow()
+        done = []
+        for candidate in candidates:
+            if not claimed:
+                break
+            done.append(candidate.id)
+            rules = MEMBERSHIP_LIMITS.get(candidate.subscription_model.lower())
+            price = rules["price_per_day"] * 7 if rules and rules["price_per_day"] else None
+            # The values read are a fast rejection; charge_reservation re-checks atomically
+            if price is None or candidate.wallet_money_amount < price or \
+                    candidate.active_reservations >= rules["max_books"] or \
+                    not charge_reservation(db, candidate.customer_id, candidate.user_id, price, rules["max_books"]):
+                continue  # cannot reserve: drop from the queue, the unit goes to the next candidate
+            db.add(Reservation(
+                customer_id=candidate.customer_id,
+                book_id=book_id,
+                start_date=now,
+                end_date=now + timedelta(days=7),
+                price=price,
+            ))
+            claimed -= 1
+            promoted += 1
 
-        # Assign reservation
-        book.units -= 1
-        new_reservation = Reservation(
-            customer_id=customer.id,  # FIXED: Correct Foreign Key Reference
-            book_id=book_id,
-            start_date=datetime.utcnow(),
-            end_date=datetime.utcnow() + timedelta(days=7),
-            price=price
-        )
-        db.add(new_reservation)
-        customer.wallet_money_amount -= price
-        db.delete(next_in_queue)  # Remove from queue
+        if claimed:
+            release_book_unit(db, book_id, claimed)
+        db.query(ReservationQueue).filter(ReservationQueue.id.in_(done)).delete(synchronize_session=False)
         db.commit()
-        db.refresh(new_reservation)
 
 def return_book(db: Session, reservation_id: int):
     """
     Handles book return and assigns it to the next user in the queue if available.
     """
-    reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
+    reservation = db.query(Reservation.book_id, Reservation.customer_id).filter(Reservation.id == reservation_id).first()
     if not reservation:
         raise HTTPException(status_code=404, detail="Reservation not found.")
+    book_id = reservation.book_id
 
-    book = db.query(Book).filter(Book.id == reservation.book_id).first()
-    book.units += 1  # Increase available book count
-    db.delete(reservation)
+    # Delete first: only the caller that actually removed the row gives the unit back,
+    # so a concurrent return or the expiry worker cannot restock it twice
+    if not db.query(Reservation).filter(Reservation.id == reservation_id).delete(synchronize_session="evaluate"):
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Reservation not found.")
+    release_book_unit(db, book_id)  # Increase available book count
+    release_reservation_slots(db, Counter({reservation.customer_id: 1}))
     db.commit()
 
     # Check if someone is waiting in the queue
-    process_reservation_queue(db, book.id)
+    process_reservation_queue(db, book_id)
+
+def expire_reservations(db: Session, batch_size: int) -> dict:
+    """
+    Ends one batch of reservations whose end_date has been reached:
+    - picks the oldest due reservations through ix_reservations_end_date,
+      locked FOR UPDATE SKIP LOCKED so several instances take disjoint batches;
+    - deletes them, restocks every affected book and gives back every affected
+      customer's reservation slots, with one grouped UPDATE each;
+    - commits, then promotes each affected book's waitlist.
+    Returns the number of expired reservations and promoted customers.
+    """
+    today = datetime.utcnow().date()
+    due = (
+        db.query(Reservation.id, Reservation.book_id, Reservation.customer_id)
+        .filter(Reservation.end_date <= today)
+        .order_by(Reservation.end_date, Reservation.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not due:
+        db.rollback()
+        return {"expired": 0, "promoted": 0}
+
+    restock = Counter(row.book_id for row in due)
+    # Lock the books in id order, so concurrent batches sharing books cannot deadlock
+    db.query(Book.id).filter(Book.id.in_(restock)).order_by(Book.id).with_for_update().all()
+    db.query(Reservation).filter(Reservation.id.in_([row.id for row in due])).delete(synchronize_session=False)
+    db.query(Book).filter(Book.id.in_(restock)).update(
+        {
+            Book.units: Book.units + case(restock, value=Book.id, else_=0),
+            Book.version: Book.version + 1,
+            Book.updated_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+    invalidate_on_commit(db, catalog_cache, *[("book", book_id) for book_id in restock])
+    release_reservation_slots(db, Counter(row.customer_id for row in due))
+    db.commit()
+
+    promoted = sum(process_reservation_queue(db, book_id) for book_id in sorted(restock))
+    return {"expired": len(due), "promoted": promoted}
+
+def reservation_expiry_lag(db: Session) -> float:
+    """
+    Seconds since the oldest reservation still waiting for expiry became due, 0 when none is.
+    """
+    today = datetime.utcnow().date()
+    oldest = db.query(func.min(Reservation.end_date)).filter(Reservation.end_date <= today).scalar()
+    db.rollback()
+    if oldest is None:
+        return 0.0
+    return (datetime.utcnow() - datetime.combine(oldest, datetime.min.time())).total_seconds()
+
+def reconcile_active_reservations(db: Session, fix: bool = True, sample: int = 20) -> dict:
+    """
+    Recomputes customers.active_reservations from the reservations table with one
+    GROUP BY and reports the customers whose counter drifted.
+    With `fix`, each drifted counter is set to the actual count, guarded by the
+    value that was read, so a reservation made meanwhile is never overwritten.
+    """
+    actual = (
+        select(Reservation.customer_id, func.count(Reservation.id).label("count"))
+        .group_by(Reservation.customer_id)
+        .subquery()
+    )
+    counted = func.coalesce(actual.c.count, 0)
+    drifted = db.execute(
+        select(Customer.id, Customer.active_reservations, counted.label("actual"))
+        .outerjoin(actual, actual.c.customer_id == Customer.id)
+        .where(Customer.active_reservations != counted)
+        .order_by(Customer.id)
+    ).all()
+
+    fixed = 0
+    if fix:
+        for row in drifted:
+            fixed += db.query(Customer).filter(
+                Customer.id == row.id, Customer.active_reservations == row.active_reservations
+            ).update({Customer.active_reservations: row.actual}, synchronize_session=False)
+        db.commit()
+    else:
+        db.rollback()
+
+    if drifted:
+        logger.warning("active_reservations drifted for %d customers (%d fixed)", len(drifted), fixed)
+    return {
+        "drifted": len(drifted),
+        "fixed": fixed,
+        "total_drift": sum(row.active_reservations - row.actual for row in drifted),
+        "sample": [
+            {"customer_id": row.id, "counter": row.active_reservations, "actual": row.actual}
+            for row in drifted[:sample]
+        ],
+    }
 
 def exit_reservation_queue(db: Session, customer: Customer, book_id: int):
     """
@@ -154,3 +349,19 @@ def exit_reservation_queue(db: Session, customer: Customer, book_id: int):
     db.commit()
     return {"message": "You have successfully exited the reservation queue."}
 
+
+# ----------------------------------------
+# Async variants (used by the routers, see app.database.run_db)
+# ----------------------------------------
+
+async def reserve_book_async(db, customer: Customer, reservation_data: ReservationCreate):
+    return await run_db(db, reserve_book, customer, reservation_data)
+
+async def process_reservation_queue_async(db, book_id: int):
+    return await run_db(db, process_reservation_queue, book_id)
+
+async def return_book_async(db, reservation_id: int):
+    return await run_db(db, return_book, reservation_id)
+
+async def exit_reservation_queue_async(db, customer: Customer, book_id: int):
+    return await run_db(db, exit_reservation_queue, customer, book_id)
@@ -0,0 +1,172 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from app.database import run_db
+from app.core.autocomplete import title_index
+from app.core.config import AUTOCOMPLETE_TRIE
+
+# Highlight markers around matched terms in title_highlight/description_highlight
+HIGHLIGHT_START = "<b>"
+HIGHLIGHT_STOP = "</b>"
+
+# Postgres: book matches come from books.search_vector (GIN), author-name matches from
+# the users name expression index; a book's rank is the sum of both (author hits weigh half).
+POSTGRES_SEARCH = text(f"""
+WITH q AS (
+    SELECT websearch_to_tsquery('english', :q) AS books_query,
+           websearch_to_tsquery('simple', :q) AS names_query
+),
+matches AS (
+    SELECT b.id, ts_rank_cd(b.search_vector, q.books_query) AS rank
+    FROM books b, q
+    WHERE b.search_vector @@ q.books_query
+    UNION ALL
+    SELECT ab.book_id, 0.5 * ts_rank_cd(to_tsvector('simple', u.first_name || ' ' || u.last_name), q.names_query)
+    FROM q, users u
+    JOIN authors a ON a.user_id = u.id
+    JOIN author_book ab ON ab.author_id = a.id
+    WHERE to_tsvector('simple', u.first_name || ' ' || u.last_name) @@ q.names_query
+),
+ranked AS (
+    SELECT id, sum(rank) AS rank FROM matches
+    GROUP BY id ORDER BY rank DESC, id LIMIT :limit OFFSET :skip
+)
+SELECT b.id, b.title, b.isbn, b.price, b.author_id, b.description, b.units, r.rank,
+       ts_headline('english', b.title, q.books_query,
+                   'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, HighlightAll=true') AS title_highlight,
+       ts_headline('english', coalesce(b.description, ''), q.books_query,
+                   'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2') AS description_highlight
+FROM ranked r JOIN books b ON b.id = r.id, q
+ORDER BY r.rank DESC, b.id
+""")
+
+# SQLite: FTS5 table books_fts (rowid = books.id); bm25 weights title > author names > description
+SQLITE_SEARCH = text(f"""
+SELECT b.id, b.title, b.isbn, b.price, b.author_id, b.description, b.units,
+       -bm25(books_fts, 10.0, 1.0, 5.0) AS rank,
+       highlight(books_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}') AS title_highlight,
+       snippet(books_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}', '...', 24) AS description_highlight
+FROM books_fts JOIN books b ON b.id = books_fts.rowid
+WHERE books_fts MATCH :q
+ORDER BY rank DESC, b.id
+LIMIT :limit OFFSET :skip
+""")
+
+
+def fts5_query(q: str):
+    """
+    Quotes every term so user input is never parsed as FTS5 query syntax (terms are ANDed).
+    """
+    terms = q.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def search_books(db: Session, q: str, skip: int = 0, limit: int = 10):
+    """
+    Ranked, highlighted full-text search over title, description and author names.
+    """
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        rows = db.execute(POSTGRES_SEARCH, {"q": q, "skip": skip, "limit": limit})
+    elif dialect == "sqlite":
+        rows = db.execute(SQLITE_SEARCH, {"q": fts5_query(q), "skip": skip, "limit": limit})
+    else:
+        raise HTTPException(status_code=501, detail=f"Search is not available on {dialect}")
+    return [dict(row._mapping) for row in rows]
+
+
+async def search_books_async(db, q: str, skip: int = 0, limit: int = 10):
+    return await run_db(db, search_books, q, skip, limit)
+
+
+# ----------------------------------------
+# Autocomplete
+# ----------------------------------------
+
+# Upper bound for ?limit=, and how many entries each trie node keeps
+AUTOCOMPLETE_MAX_LIMIT = 20
+
+AUTHOR_NAME = "lower(u.first_name || ' ' || u.last_name)"
+
+# Postgres: the text_pattern_ops expression indexes serve both the prefix LIKE and,
+# through ORDER BY ... USING ~<~, the ordering, so only `limit` index entries are read.
+POSTGRES_AUTOCOMPLETE_BOOKS = text("""
+SELECT b.id, b.title AS text FROM books b
+WHERE lower(b.title) LIKE :pattern ESCAPE '\\'
+ORDER BY lower(b.title) USING ~<~ LIMIT :limit
+""")
+
+POSTGRES_AUTOCOMPLETE_AUTHORS = text(f"""
+SELECT a.id, u.first_name || ' ' || u.last_name AS text
+FROM users u JOIN authors a ON a.user_id = u.id
+WHERE {AUTHOR_NAME} LIKE :pattern ESCAPE '\\'
+ORDER BY {AUTHOR_NAME} USING ~<~ LIMIT :limit
+""")
+
+SQLITE_AUTOCOMPLETE_BOOKS = text("""
+SELECT b.id, b.title AS text FROM books b
+WHERE lower(b.title) LIKE :pattern ESCAPE '\\'
+ORDER BY lower(b.title) LIMIT :limit
+""")
+
+SQLITE_AUTOCOMPLETE_AUTHORS = text(f"""
+SELECT a.id, u.first_name || ' ' || u.last_name AS text
+FROM users u JOIN authors a ON a.user_id = u.id
+WHERE {AUTHOR_NAME} LIKE :pattern ESCAPE '\\'
+ORDER BY {AUTHOR_NAME} LIMIT :limit
+""")
+
+
+def like_prefix(prefix: str):
+    """
+    LIKE pattern matching values that start with `prefix`, wildcards in the input escaped.
+    """
+    escaped = prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def load_title_index(db: Session):
+    """
+    Fills the process-wide trie from every book title and author name.
+    """
+    books = db.execute(text("SELECT id, title FROM books").execution_options(yield_per=1000))
+    authors = db.execute(text(
+        "SELECT a.id, u.first_name || ' ' || u.last_name FROM users u JOIN authors a ON a.user_id = u.id"
+    ).execution_options(yield_per=1000))
+    title_index.load(books, authors, AUTOCOMPLETE_MAX_LIMIT)
+
+
+def autocomplete(db: Session, prefix: str, limit: int = 10):
+    """
+    Book titles and author names starting with `prefix` (case-insensitive), alphabetically.
+    """
+    prefix = prefix.strip()
+    if not prefix:
+        return []
+    if AUTOCOMPLETE_TRIE:
+        if not title_index.loaded:
+            load_title_index(db)
+        return title_index.trie.search(prefix, limit)
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        queries = (("book", POSTGRES_AUTOCOMPLETE_BOOKS), ("author", POSTGRES_AUTOCOMPLETE_AUTHORS))
+    elif dialect == "sqlite":
+        queries = (("book", SQLITE_AUTOCOMPLETE_BOOKS), ("author", SQLITE_AUTOCOMPLETE_AUTHORS))
+    else:
+        raise HTTPException(status_code=501, detail=f"Autocomplete is not available on {dialect}")
+    params = {"pattern": like_prefix(prefix), "limit": limit}
+    suggestions = [
+        {"text": row.text, "kind": kind, "id": row.id}
+        for kind, query in queries
+        for row in db.execute(query, params)
+    ]
+    suggestions.sort(key=lambda s: (s["text"].lower(), s["kind"], s["id"]))
+    return suggestions[:limit]
+
+
+async def autocomplete_async(db, prefix: str, limit: int = 10):
+    return await run_db(db, autocomplete, prefix, limit)
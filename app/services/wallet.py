@@ -1,6 +1,26 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app.models import Customer
+from app.database import run_db
+from app.core.cache import invalidate_on_commit
+from app.core.principal import principal_cache, principal_key
+
+def debit_wallet(db: Session, customer_id: int, user_id: int, amount, *criteria, **changes) -> bool:
+    """
+    Atomically debits a wallet: UPDATE ... WHERE wallet_money_amount >= amount.
+    `criteria` are further conditions the customer row must meet and `changes`
+    further customer columns to set, both in the same statement.
+    """
+    debited = db.query(Customer).filter(
+        Customer.id == customer_id, Customer.wallet_money_amount >= amount, *criteria
+    ).update(
+        {Customer.wallet_money_amount: Customer.wallet_money_amount - amount,
+         **{getattr(Customer, column): value for column, value in changes.items()}},
+        synchronize_session=False,
+    )
+    if debited:
+        invalidate_on_commit(db, principal_cache, principal_key(user_id))
+    return bool(debited)
 
 def add_money_to_wallet(db: Session, customer_id: int, amount: float):
     """
@@ -13,8 +33,16 @@ def add_money_to_wallet(db: Session, customer_id: int, amount: float):
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    customer.wallet_money_amount += amount
+    # Increment in SQL: concurrent top-ups and debits are never lost
+    db.query(Customer).filter(Customer.id == customer_id).update(
+        {Customer.wallet_money_amount: Customer.wallet_money_amount + amount}, synchronize_session=False
+    )
+    invalidate_on_commit(db, principal_cache, principal_key(customer.user_id))
     db.commit()
     db.refresh(customer)
 
     return customer
+
+
+async def add_money_to_wallet_async(db, customer_id: int, amount: float):
+    return await run_db(db, add_money_to_wallet, customer_id, amount)
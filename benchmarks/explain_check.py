@@ -0,0 +1,95 @@
+"""
+EXPLAIN-based regression check for the reservation hot-path queries.
+
+Fails (exit code 1) when any of the queries below would read its table with a
+sequential scan instead of an index. On Postgres sequential scans are disabled
+for the check (enable_seqscan = off), so the result does not depend on table
+size: a Seq Scan in the plan means no usable index exists.
+
+    DATABASE_URL=postgresql://... python benchmarks/explain_check.py
+    DATABASE_URL=sqlite:////tmp/check.db python benchmarks/explain_check.py --create-schema
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import func, select, text  # noqa: E402
+
+from app.database import Base, get_engine  # noqa: E402
+from app.models import Customer, Reservation, ReservationQueue  # noqa: E402
+
+# (description, table that must be read through an index, statement)
+CHECKS = [
+    ("a customer's reservations", "reservations",
+     select(func.count(Reservation.id)).where(Reservation.customer_id == 1)),
+    ("admin: reservations of a book", "reservations",
+     select(Reservation).where(Reservation.book_id == 1)),
+    ("admin: a customer's reservation of a book", "reservations",
+     select(Reservation).where(Reservation.book_id == 1, Reservation.customer_id == 1)),
+    ("process_reservation_queue: queue of a book by priority and arrival", "reservation_queue",
+     select(ReservationQueue).where(ReservationQueue.book_id == 1)
+     .order_by(ReservationQueue.priority.desc(), ReservationQueue.created_at.asc()).limit(100)),
+    ("expire_reservations: due reservations, oldest first", "reservations",
+     select(Reservation.id, Reservation.book_id).where(Reservation.end_date <= date(2026, 1, 1))
+     .order_by(Reservation.end_date, Reservation.id).limit(500)),
+    ("exit_reservation_queue: a customer's queue entry", "reservation_queue",
+     select(ReservationQueue).where(ReservationQueue.customer_id == 1, ReservationQueue.book_id == 1)),
+    ("get_current_customer: customer by user", "customers",
+     select(Customer).where(Customer.user_id == 1)),
+]
+
+
+def postgres_seq_scans(connection, statement):
+    connection.execute(text("SET LOCAL enable_seqscan = off"))
+    sql = str(statement.compile(connection, compile_kwargs={"literal_binds": True}))
+    plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan":
+            yield node.get("Relation Name")
+        for child in node.get("Plans", []):
+            yield from walk(child)
+
+    return list(walk(plan[0]["Plan"])), json.dumps(plan, indent=1)
+
+
+def sqlite_seq_scans(connection, statement):
+    sql = str(statement.compile(connection, compile_kwargs={"literal_binds": True}))
+    rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    details = [row[-1] for row in rows]
+    scans = [d.split()[1] for d in details if d.startswith("SCAN ") and "INDEX" not in d]
+    return scans, "\n".join(details)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--create-schema", action="store_true", help="create tables from the models first (scratch DBs only)")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if args.create_schema:
+        Base.metadata.create_all(bind=engine)
+    explain = postgres_seq_scans if engine.dialect.name == "postgresql" else sqlite_seq_scans
+
+    failures = 0
+    with engine.connect() as connection:
+        for description, table, statement in CHECKS:
+            with connection.begin():
+                scans, plan = explain(connection, statement)
+            ok = table not in scans
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {description}")
+            if args.verbose or not ok:
+                print(plan)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
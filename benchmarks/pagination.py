@@ -0,0 +1,89 @@
+"""
+Deep-page latency: offset (skip/limit) versus keyset (cursor) pagination on `books`.
+
+Seeds a books table with --rows rows (default 1,000,000) and times fetching page
+--page (default 1000) both ways through app.crud.get_all_books.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/pagination.py
+    DATABASE_URL=postgresql://... python benchmarks/pagination.py --rows 1000000
+
+Only point this at a scratch database: it creates tables and inserts rows.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import func, insert  # noqa: E402
+
+from app import crud  # noqa: E402
+from app.core.pagination import encode_cursor  # noqa: E402
+from app.database import Base, SessionLocal, get_engine  # noqa: E402
+from app.models import Author, Book, City, User  # noqa: E402
+
+
+def seed(rows: int, batch: int = 10000):
+    Base.metadata.create_all(bind=get_engine())
+    db = SessionLocal()
+    try:
+        existing = db.query(func.count(Book.id)).scalar()
+        if existing >= rows:
+            return
+        if not db.query(Author).first():
+            db.add(User(id=1, username="bench", first_name="b", last_name="b", email="bench@example.com", password="x"))
+            db.add(City(id=1, name="bench"))
+            db.flush()
+            db.add(Author(id=1, user_id=1, city_id=1))
+            db.commit()
+        for start in range(existing, rows, batch):
+            db.execute(insert(Book), [
+                {"title": f"Title {i:08d}", "isbn": f"bench-{i}", "price": 10.0, "author_id": 1, "units": 1}
+                for i in range(start, min(start + batch, rows))
+            ])
+            db.commit()
+    finally:
+        db.close()
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    skip = (args.page - 1) * args.limit
+    db = SessionLocal()
+    try:
+        # The cursor a client would hold after reading page - 1
+        boundary = db.query(Book).order_by(Book.id).offset(skip - 1).limit(1).one()
+        cursor = encode_cursor("id", boundary.id, boundary.id)
+        offset_ms = timed(lambda: crud.get_all_books(db, skip=skip, limit=args.limit), args.repeat)
+        keyset_ms = timed(lambda: crud.get_all_books(db, limit=args.limit, cursor=cursor), args.repeat)
+        assert [b.id for b in crud.get_all_books(db, skip=skip, limit=args.limit)] == \
+            [b.id for b in crud.get_all_books(db, limit=args.limit, cursor=cursor)]
+    finally:
+        db.close()
+
+    print(f"rows={args.rows} page={args.page} limit={args.limit}")
+    print(f"offset pagination  median {offset_ms:8.2f} ms")
+    print(f"keyset pagination  median {keyset_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Login throughput versus password hashing workers.
+
+Fires --logins concurrent POST /auth/login requests (bcrypt verify) at the app
+for each executor configuration, while a probe keeps calling GET /healthz.
+Reports logins per second, 503 rejections and the probe's median latency, which
+shows whether a login burst starves unrelated endpoints.
+
+    DATABASE_URL=sqlite:////tmp/hashing.db python benchmarks/password_hashing.py
+    DATABASE_URL=sqlite:////tmp/hashing.db PASSWORD_BCRYPT_ROUNDS=12 python benchmarks/password_hashing.py --workers 1 2 4 8
+
+Only point this at a scratch database: it creates tables and inserts rows.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("PASSWORD_BCRYPT_ROUNDS", "10")
+os.environ.setdefault("RATE_LIMIT_LOGIN", "0")  # measure hashing, not the login rate limit
+
+import httpx  # noqa: E402
+
+from app.core.hashing import password_hasher, pwd_context  # noqa: E402
+from app.database import Base, SessionLocal, get_engine  # noqa: E402
+from app.main import create_app  # noqa: E402
+from app.models import User  # noqa: E402
+
+PASSWORD = "benchmark-password"
+
+
+def seed():
+    Base.metadata.create_all(bind=get_engine())
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == "hashbench").first()
+        if user is None:
+            db.add(User(username="hashbench", first_name="Hash", last_name="Bench", email="hashbench@example.com",
+                        password=pwd_context.hash(PASSWORD), user_role="CUSTOMER"))
+        else:
+            user.password = pwd_context.hash(PASSWORD)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(app, logins: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        done = asyncio.Event()
+        probe_ms = []
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/healthz")
+                probe_ms.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.01)
+
+        async def login():
+            response = await client.post("/auth/login", json={"username": "hashbench", "password": PASSWORD})
+            return response.status_code
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+    ok = statuses.count(200)
+    return ok / elapsed, statuses.count(503), statistics.median(probe_ms) if probe_ms else 0.0
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, cores} & set(range(1, cores + 1))))
+    parser.add_argument("--max-pending", type=int, default=1000, help="raise to measure throughput, not rejection")
+    args = parser.parse_args()
+
+    seed()
+    app = create_app()
+    print(f"{args.logins} concurrent logins, bcrypt rounds={pwd_context.to_dict()['bcrypt__rounds']}, {cores} cores")
+    for kind in ("thread", "process"):
+        for workers in args.workers:
+            password_hasher.shutdown()
+            password_hasher.kind, password_hasher.workers, password_hasher.max_pending = kind, workers, args.max_pending
+            with contextlib.redirect_stdout(io.StringIO()):  # the login route prints every OTP
+                asyncio.run(run(app, min(args.logins, workers * 2)))  # warm up the pool
+                rate, rejected, probe = asyncio.run(run(app, args.logins))
+            print(f"{kind:8s} workers={workers:<3d} {rate:8.1f} logins/s  rejected={rejected:<5d} "
+                  f"/healthz p50={probe:7.2f} ms")
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
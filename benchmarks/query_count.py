@@ -0,0 +1,116 @@
+"""
+N+1 regression check: SQL statements issued per request for the catalog read endpoints.
+
+Seeds authors that each wrote several books, then requests every endpoint below
+with a small and a large page. Fails (exit code 1) when an endpoint issues more
+statements than its budget, or when the count grows with the page size, i.e.
+when serializing the response lazy loads a relationship row by row.
+
+    DATABASE_URL=sqlite:////tmp/queries.db python benchmarks/query_count.py
+    DATABASE_URL=sqlite:////tmp/queries.db DB_MODE=async python benchmarks/query_count.py
+    DATABASE_URL=postgresql://... python benchmarks/query_count.py
+
+Only point this at a scratch database: it creates tables and inserts rows.
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ["CATALOG_CACHE_SIZE"] = "0"  # count database work, not cache hits
+os.environ["PRINCIPAL_CACHE_SIZE"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, func, insert  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from app.core.auth import create_access_token  # noqa: E402
+from app.database import Base, SessionLocal, get_engine  # noqa: E402
+from app.main import create_app  # noqa: E402
+from app.models import Author, Book, City, Customer, Reservation, User, author_book  # noqa: E402
+
+# (path, statement budget) -- budgets include authentication where the route needs it
+ENDPOINTS = [
+    ("/books/?limit={limit}", 1),
+    ("/authors/?limit={limit}", 2),  # authors + one selectin query for their books
+    ("/customers/?limit={limit}", 1),
+    ("/reservations/?limit={limit}", 1),
+    ("/users/?limit={limit}", 2),  # current principal + users
+    ("/books/1", 1),
+    ("/authors/1", 1),  # author joined with its books
+]
+
+BOOKS_PER_AUTHOR = 3
+
+
+def seed(authors: int):
+    Base.metadata.create_all(bind=get_engine())
+    db = SessionLocal()
+    try:
+        if db.query(func.count(Author.id)).scalar() >= authors:
+            return
+        db.add(City(id=1, name="bench"))
+        db.execute(insert(User), [
+            {"id": i, "username": f"user{i}", "first_name": "First", "last_name": f"Last{i}",
+             "email": f"user{i}@example.com", "password": "x", "user_role": "ADMIN" if i == 1 else "AUTHOR"}
+            for i in range(1, authors + 1)
+        ])
+        db.execute(insert(Author), [{"id": i, "user_id": i, "city_id": 1} for i in range(1, authors + 1)])
+        books = [
+            {"id": (a - 1) * BOOKS_PER_AUTHOR + n + 1, "title": f"Book {a}-{n}", "isbn": f"isbn-{a}-{n}",
+             "price": 10.0, "author_id": a, "units": 1}
+            for a in range(1, authors + 1) for n in range(BOOKS_PER_AUTHOR)
+        ]
+        db.execute(insert(Book), books)
+        db.execute(insert(author_book), [{"author_id": b["author_id"], "book_id": b["id"]} for b in books])
+        db.execute(insert(Customer), [{"id": i, "user_id": i} for i in range(1, authors + 1)])
+        db.execute(insert(Reservation), [
+            {"customer_id": i, "book_id": i, "start_date": date(2026, 1, 1), "end_date": date(2026, 1, 8), "price": 7000}
+            for i in range(1, authors + 1)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--small", type=int, default=5)
+    parser.add_argument("--large", type=int, default=100)
+    args = parser.parse_args()
+
+    seed(args.large)
+    db = SessionLocal()
+    token = create_access_token(db.query(User).filter(User.id == 1).one())
+    db.close()
+
+    counter = StatementCounter()
+    failures = 0
+    with TestClient(create_app()) as client:
+        headers = {"Authorization": f"Bearer {token}"}
+        for path, budget in ENDPOINTS:
+            counts = []
+            for limit in (args.small, args.large):
+                counter.count = 0
+                response = client.get(path.format(limit=limit), headers=headers)
+                assert response.status_code == 200, (path, response.status_code, response.text)
+                counts.append(counter.count)
+            ok = max(counts) <= budget and counts[0] == counts[1]
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {path:32s} statements={counts} budget={budget}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
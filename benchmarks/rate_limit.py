@@ -0,0 +1,78 @@
+"""
+Per-request overhead of the rate limiting dependency.
+
+Calls the same dependency the routes use (limit_by_ip) with a prepared request,
+spread over --keys client addresses, and reports the mean and p99 cost per
+call. Fails (exit code 1) when the memory backend's mean exceeds --budget-us.
+--database also times the shared backend against DATABASE_URL.
+
+    python benchmarks/rate_limit.py
+    DATABASE_URL=postgresql://... python benchmarks/rate_limit.py --database
+
+Only point --database at a scratch database: it creates tables and writes rows.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite:////tmp/rate_limit_bench.db")
+
+from fastapi import Response  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from app.core import rate_limit  # noqa: E402
+from app.database import Base, SessionLocal, get_engine  # noqa: E402
+
+
+def make_requests(keys: int):
+    return [
+        Request({"type": "http", "method": "POST", "path": "/auth/login", "headers": [], "client": (f"10.0.{i // 256}.{i % 256}", 1234)})
+        for i in range(keys)
+    ]
+
+
+async def measure(dependency, requests, calls: int):
+    samples = []
+    for i in range(calls):
+        request = requests[i % len(requests)]
+        start = time.perf_counter_ns()
+        await dependency(request, Response())
+        samples.append((time.perf_counter_ns() - start) / 1000)
+    samples.sort()
+    return statistics.fmean(samples), samples[int(len(samples) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--budget-us", type=float, default=50.0)
+    parser.add_argument("--database", action="store_true")
+    args = parser.parse_args()
+
+    # Generous policy: measure the bookkeeping, not the 429 path
+    policy = rate_limit.RatePolicy("bench", 10 ** 9, 1)
+    dependency = rate_limit.limit_by_ip(policy)
+    requests = make_requests(args.keys)
+
+    rate_limit.rate_limiter = rate_limit.MemoryRateLimiter(args.keys * 2)
+    asyncio.run(measure(dependency, requests, 1000))  # warm up
+    mean, p99 = asyncio.run(measure(dependency, requests, args.calls))
+    ok = mean <= args.budget_us
+    print(f"{'ok  ' if ok else 'FAIL'} memory    mean={mean:7.2f} us  p99={p99:7.2f} us  budget={args.budget_us} us")
+
+    if args.database:
+        Base.metadata.create_all(bind=get_engine())
+        rate_limit.rate_limiter = rate_limit.DatabaseRateLimiter(SessionLocal)
+        mean, p99 = asyncio.run(measure(dependency, requests, min(args.calls, 2000)))
+        print(f"     database  mean={mean:7.2f} us  p99={p99:7.2f} us")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Concurrency stress test of the reservation path: no oversold books, no negative wallets.
+
+Seeds --books books with --units copies each and --customers premium customers
+whose wallets cover only --affordable one-day reservations, then fires --requests
+reserve_book calls from --threads threads, each with its own session. With
+--returns, that many reservations are then returned concurrently, which
+promotes queued customers through process_reservation_queue. Afterwards:
+- every book's units >= 0 and units taken == reservations of that book
+- every wallet >= 0, and without --returns money spent == sum of that
+  customer's reservation prices (returns do not refund)
+- every customer's active_reservations == their reservations <= max_books
+Fails (exit code 1) on any violation. --hot sends every request to one book.
+
+    DATABASE_URL=postgresql://... python benchmarks/reservation_stress.py --threads 64
+    DATABASE_URL=sqlite:////tmp/stress.db python benchmarks/reservation_stress.py --threads 8
+
+SQLite serializes writers, so expect lock timeouts ("errors") there; the
+invariants must hold either way. Only point this at a scratch database.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+
+from app.database import Base, SessionLocal, get_engine  # noqa: E402
+from app.models import Author, Book, City, Customer, Reservation, User  # noqa: E402
+from app.schemas import ReservationCreate  # noqa: E402
+from app.services.reservations import MEMBERSHIP_LIMITS, reserve_book, return_book  # noqa: E402
+
+PRICE = MEMBERSHIP_LIMITS["premium"]["price_per_day"]  # one-day reservations
+MAX_BOOKS = MEMBERSHIP_LIMITS["premium"]["max_books"]
+
+
+def seed(books: int, units: int, customers: int, affordable: int):
+    Base.metadata.create_all(bind=get_engine())
+    run = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        city = City(name=f"stress-{run}")
+        owner = User(username=f"stress-author-{run}", first_name="Stress", last_name="Author",
+                     email=f"stress-author-{run}@example.com", password="x", user_role="AUTHOR")
+        db.add_all([city, owner])
+        db.flush()
+        author = Author(user_id=owner.id, city_id=city.id)
+        db.add(author)
+        db.flush()
+        book_rows = [Book(title=f"Stress {run} {i}", isbn=f"stress-{run}-{i}", price=10, units=units, author_id=author.id)
+                     for i in range(books)]
+        users = [User(username=f"stress-{run}-{i}", first_name="Stress", last_name=str(i),
+                      email=f"stress-{run}-{i}@example.com", password="x") for i in range(customers)]
+        db.add_all(book_rows + users)
+        db.flush()
+        customer_rows = [Customer(user_id=user.id, subscription_model="premium", wallet_money_amount=PRICE * affordable)
+                         for user in users]
+        db.add_all(customer_rows)
+        db.commit()
+        return [b.id for b in book_rows], [c.id for c in customer_rows]
+    finally:
+        db.close()
+
+
+def worker(requests: list, outcomes: Counter, lock: threading.Lock):
+    start = date.today()
+    for customer_id, book_id in requests:
+        db = SessionLocal()
+        try:
+            result = reserve_book(db, SimpleNamespace(id=customer_id), ReservationCreate(
+                book_id=book_id, start_date=start, end_date=start + timedelta(days=1), price=PRICE,
+            ))
+            outcome = "queued" if isinstance(result, dict) else "reserved"
+        except HTTPException as exc:
+            outcome = f"rejected {exc.status_code}"
+        except Exception as exc:  # lock timeouts, serialization failures, ...
+            outcome = f"error {type(exc).__name__}"
+        finally:
+            db.close()
+        with lock:
+            outcomes[outcome] += 1
+
+
+def returner(reservation_ids: list, outcomes: Counter, lock: threading.Lock):
+    for reservation_id in reservation_ids:
+        db = SessionLocal()
+        try:
+            return_book(db, reservation_id)
+            outcome = "returned"
+        except HTTPException as exc:
+            outcome = f"return rejected {exc.status_code}"
+        except Exception as exc:
+            outcome = f"return error {type(exc).__name__}"
+        finally:
+            db.close()
+        with lock:
+            outcomes[outcome] += 1
+
+
+def run_threads(target, items: list, threads: int, *args):
+    workers = [threading.Thread(target=target, args=(items[i::threads], *args)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def check(book_ids, customer_ids, units: int, affordable: int, refunds_unknown: bool):
+    db = SessionLocal()
+    try:
+        violations = []
+        taken = dict(db.query(Reservation.book_id, func.count(Reservation.id))
+                     .filter(Reservation.book_id.in_(book_ids)).group_by(Reservation.book_id))
+        for book_id, left in db.query(Book.id, Book.units).filter(Book.id.in_(book_ids)):
+            if left < 0 or units - left != taken.get(book_id, 0):
+                violations.append(f"book {book_id}: units={left}, reservations={taken.get(book_id, 0)}")
+        spent = dict(db.query(Reservation.customer_id, func.sum(Reservation.price))
+                     .filter(Reservation.customer_id.in_(customer_ids)).group_by(Reservation.customer_id))
+        held = dict(db.query(Reservation.customer_id, func.count(Reservation.id))
+                    .filter(Reservation.customer_id.in_(customer_ids)).group_by(Reservation.customer_id))
+        for customer_id, wallet, active in db.query(Customer.id, Customer.wallet_money_amount, Customer.active_reservations) \
+                .filter(Customer.id.in_(customer_ids)):
+            if wallet < 0 or (not refunds_unknown and PRICE * affordable - wallet != (spent.get(customer_id) or 0)):
+                violations.append(f"customer {customer_id}: wallet={wallet}, spent={spent.get(customer_id) or 0}")
+            if active != held.get(customer_id, 0) or active > MAX_BOOKS:
+                violations.append(f"customer {customer_id}: active_reservations={active}, reservations={held.get(customer_id, 0)}")
+        return violations
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--units", type=int, default=10)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--affordable", type=int, default=2, help="reservations each wallet can pay for")
+    parser.add_argument("--hot", action="store_true", help="every request targets the same book")
+    parser.add_argument("--returns", type=int, default=0, help="reservations to return concurrently afterwards")
+    args = parser.parse_args()
+
+    book_ids, customer_ids = seed(args.books, args.units, args.customers, args.affordable)
+    rng = random.Random(42)
+    requests = [(rng.choice(customer_ids), book_ids[0] if args.hot else rng.choice(book_ids))
+                for _ in range(args.requests)]
+    outcomes, lock = Counter(), threading.Lock()
+    elapsed = run_threads(worker, requests, args.threads, outcomes, lock)
+    print(f"{args.requests} requests, {args.threads} threads, {elapsed:.2f} s ({args.requests / elapsed:.0f} req/s)")
+
+    if args.returns:
+        db = SessionLocal()
+        reservation_ids = [r for (r,) in db.query(Reservation.id).filter(Reservation.book_id.in_(book_ids))
+                           .order_by(Reservation.id).limit(args.returns)]
+        db.close()
+        elapsed = run_threads(returner, reservation_ids, args.threads, outcomes, lock)
+        print(f"{len(reservation_ids)} returns, {args.threads} threads, {elapsed:.2f} s")
+
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome:32s} {count}")
+    violations = check(book_ids, customer_ids, args.units, args.affordable, refunds_unknown=bool(args.returns))
+    for violation in violations[:20]:
+        print(f"FAIL {violation}")
+    print("ok   no book oversold, no wallet overdrawn, counters exact" if not violations else f"FAIL {len(violations)} violations")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
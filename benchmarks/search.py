@@ -0,0 +1,109 @@
+"""
+Full-text search latency (p50/p95) for app.services.search.search_books.
+
+Seeds --rows books (default 1,000,000) with random titles/descriptions drawn
+from a fixed vocabulary, then times --queries random one and two word searches.
+
+    DATABASE_URL=postgresql://... python benchmarks/search.py          # after `alembic upgrade head`
+    DATABASE_URL=sqlite:////tmp/search.db python benchmarks/search.py --create-schema
+
+Only point this at a scratch database: it inserts rows.
+"""
+import argparse
+import glob
+import importlib.util
+import os
+import random
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import func, insert, text  # noqa: E402
+
+from app.database import Base, SessionLocal, get_engine  # noqa: E402
+from app.models import Author, Book, City, User  # noqa: E402
+from app.services.search import search_books  # noqa: E402
+
+# ~8k pseudo-words, so a term matches a realistic fraction of the catalog
+SYLLABLES = "ka lo mi ren tor vas bel dun fi gar hol jen kir lum nor pel qua ris sol tem".split()
+WORDS = sorted({a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES})
+
+
+def create_sqlite_search_schema():
+    """
+    Scratch SQLite databases have no Alembic history: create the tables from the
+    models and apply the FTS5 statements from the search migration.
+    """
+    Base.metadata.create_all(bind=get_engine())
+    path = glob.glob(os.path.join(PROJECT_ROOT, "alembic", "versions", "*_add_book_full_text_search.py"))[0]
+    spec = importlib.util.spec_from_file_location("search_migration", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with get_engine().begin() as connection:
+        exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'books_fts'")).first()
+        if not exists:
+            for statement in migration.SQLITE_UPGRADE:
+                connection.execute(text(statement))
+
+
+def seed(rows: int, batch: int = 10000):
+    rng = random.Random(42)
+    db = SessionLocal()
+    try:
+        existing = db.query(func.count(Book.id)).scalar()
+        if not db.query(Author).first():
+            db.add(User(id=1, username="bench", first_name="Ada", last_name="Writer", email="bench@example.com", password="x"))
+            db.add(City(id=1, name="bench"))
+            db.flush()
+            db.add(Author(id=1, user_id=1, city_id=1))
+            db.commit()
+        for start in range(existing, rows, batch):
+            db.execute(insert(Book), [
+                {
+                    "title": " ".join(rng.sample(WORDS, 3)),
+                    "description": " ".join(rng.choices(WORDS, k=20)),
+                    "isbn": f"search-{i}", "price": 10.0, "author_id": 1, "units": 1,
+                }
+                for i in range(start, min(start + batch, rows))
+            ])
+            db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--create-schema", action="store_true", help="SQLite scratch DB: create tables and FTS5 index")
+    args = parser.parse_args()
+
+    if args.create_schema:
+        create_sqlite_search_schema()
+    seed(args.rows)
+
+    rng = random.Random(7)
+    samples = []
+    db = SessionLocal()
+    try:
+        for _ in range(args.queries):
+            q = " ".join(rng.sample(WORDS, rng.choice([1, 2])))
+            start = time.perf_counter()
+            search_books(db, q, limit=args.limit)
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        db.close()
+
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"rows={args.rows} queries={args.queries} limit={args.limit}")
+    print(f"p50 {statistics.median(samples):8.2f} ms   p95 {p95:8.2f} ms   max {samples[-1]:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Serialization cost of GET /books/?limit=500: FastAPI's default path versus the fast path.
+
+"before" mounts the same query behind a plain `response_model=list[BookResponse]`
+route with the default JSONResponse, as every list endpoint used to be. "after" is
+the real app: TypeAdapter serialization, orjson default response class and
+compression. Both read the same rows through the same crud function, so the
+difference is serialization (and compression) only.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/serialization.py
+    DATABASE_URL=postgresql://... python benchmarks/serialization.py --repeat 50
+
+Only point this at a scratch database: it creates tables and inserts rows.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DB_MODE", "sync")
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import crud  # noqa: E402
+from app.database import get_read_db  # noqa: E402
+from app.main import create_app  # noqa: E402
+from app.schemas import BookResponse  # noqa: E402
+from benchmarks.pagination import seed  # noqa: E402
+
+
+def legacy_app() -> FastAPI:
+    app = FastAPI(default_response_class=JSONResponse)
+
+    @app.get("/books/", response_model=list[BookResponse])
+    async def get_books(limit: int = 10, db=Depends(get_read_db)):
+        return await crud.get_all_books_async(db, limit=limit)
+
+    return app
+
+
+def measure(client: TestClient, limit: int, repeat: int, headers=None):
+    samples = []
+    response = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get("/books/", params={"limit": limit}, headers=headers or {})
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    # httpx decodes the body; the raw stream size is what went over the wire
+    wire_bytes = int(response.headers.get("content-length", len(response.content)))
+    return statistics.median(samples), wire_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    runs = [
+        ("before  response_model + JSONResponse", legacy_app(), {"Accept-Encoding": "identity"}),
+        ("after   TypeAdapter + orjson", create_app(), {"Accept-Encoding": "identity"}),
+        ("after   TypeAdapter + orjson, gzip", create_app(), {"Accept-Encoding": "gzip"}),
+        ("after   TypeAdapter + orjson, br", create_app(), {"Accept-Encoding": "br"}),
+    ]
+    print(f"GET /books/?limit={args.limit}, median of {args.repeat}")
+    for label, app, headers in runs:
+        with TestClient(app) as client:
+            measure(client, args.limit, 3, headers)  # warm up connections and caches
+            ms, size = measure(client, args.limit, args.repeat, headers)
+        print(f"{label:40s} {ms:8.2f} ms {size:9d} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Startup-time benchmark: cold import of app.main and time to first request.
+
+Each sample runs in a fresh interpreter so nothing is cached between runs.
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = r"""
+import json, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    response = client.get("/healthz")
+    t3 = time.perf_counter()
+assert response.status_code == 200
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_request_ms": (t3 - t0) * 1000}))
+"""
+
+
+def run_sample():
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "benchmark")
+    output = subprocess.run(
+        [sys.executable, "-c", SAMPLE], cwd=PROJECT_ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(label, values):
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    print(f"{label:<22} median {statistics.median(values):8.1f} ms   p95 {p95:8.1f} ms   max {values[-1]:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    samples = [run_sample() for _ in range(args.runs)]
+    summarize("cold import", [s["import_ms"] for s in samples])
+    summarize("time to first request", [s["first_request_ms"] for s in samples])
+
+
+if __name__ == "__main__":
+    main()